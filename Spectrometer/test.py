@@ -2,6 +2,7 @@
 import logging
 import datetime
 import os
+import numpy as np
 from aseq_spectrometer import LR1
 
 logging.basicConfig(level=logging.INFO)
@@ -35,22 +36,19 @@ with LR1.discover() as spectro:
         
         # Write wavelength data
         f.write("Wavelengths (nm):\n")
-        for wl in cal.wavelengths:
-            f.write(f"{wl:.6f}\n")
+        np.savetxt(f, cal.wavelengths, fmt="%.6f")
         
         f.write("\n")
         
         # Write PRNU normalization data
         f.write("PRNU Normalization:\n")
-        for prnu in cal.prnu_norm:
-            f.write(f"{prnu:.6f}\n")
+        np.savetxt(f, cal.prnu_norm, fmt="%.6f")
         
         f.write("\n")
         
         # Write irradiance normalization data
         f.write("Irradiance Normalization:\n")
-        for irr in cal.irr_norm:
-            f.write(f"{irr:.6f}\n")
+        np.savetxt(f, cal.irr_norm, fmt="%.6f")
     
     print(f"\nCalibration data saved to: {filename}")
     print(f"Model: {cal.model}")
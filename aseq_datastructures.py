@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from enum import IntEnum, IntFlag
+import io
 import numpy as np
 import struct
 
@@ -14,6 +15,7 @@ ZERO_REPORT_ID = 0
 PACKET_SIZE_BYTES = 64
 STANDARD_TIMEOUT_MS = 100
 PARAMETER_SET_DELAY_S = 0.1
+CAPTURE_MARGIN_S = 0.005
 MAX_PACKETS_IN_FRAME = 124
 REMAINING_PACKETS_ERROR = 250
 NUM_OF_PIXELS_IN_PACKET = 30
@@ -24,6 +26,10 @@ FLASH_MAX_OFFSET = 0x1FFFF
 FLASH_MAX_BYTES = 0x20000
 CALIBRATION_LINES = 10975  # for python 3.11+ we had to change the way the numpy arrays are initialized in the dataclass. this changed the number of lines read in the flash by 1 -Ilia
 
+# Payload layouts of the parameter and frame format reports.
+_PARAMETERS_STRUCT = struct.Struct("<HHBL")
+_FRAME_FORMAT_STRUCT = struct.Struct("<HHBH")
+
 
 class RequestCode(IntEnum):
     status = 1
@@ -103,14 +109,14 @@ class Parameters:
     scan_mode: ScanMode = ScanMode.continuous
     exposure_time_ms: int = 10
 
-    def from_bytes(self, report: list) -> Parameters:
+    def from_bytes(self, report: bytes) -> Parameters:
         # Assumes the incoming report still has the first ID byte.
         (
             self.scan_count,
             self.blank_scan_count,
             scan_mode,
             exp_10s_of_us,
-        ) = struct.unpack("<HHBL", bytearray(report[1:10]))
+        ) = _PARAMETERS_STRUCT.unpack_from(report, 1)
 
         self.scan_mode = ScanMode(scan_mode)
         self.exposure_time_ms = exp_10s_of_us / 100
@@ -118,8 +124,7 @@ class Parameters:
 
     def to_bytes(self) -> bytearray:
         exp_10s_of_us = int(self.exposure_time_ms * 100)
-        report = struct.pack(
-            "<HHBL",
+        report = _PARAMETERS_STRUCT.pack(
             self.scan_count,
             self.blank_scan_count,
             self.scan_mode.value,
@@ -135,20 +140,19 @@ class FrameFormat:
     reduction_mode: AverageMode = AverageMode.disabled
     pixels_in_frame: int = 10
 
-    def from_bytes(self, report: list) -> FrameFormat:
+    def from_bytes(self, report: bytes) -> FrameFormat:
         # Assumes the incoming report still has the first ID byte.
         (
             self.start_element,
             self.end_element,
             reduction_mode,
             self.pixels_in_frame,
-        ) = struct.unpack("<HHBH", bytearray(report[1:8]))
+        ) = _FRAME_FORMAT_STRUCT.unpack_from(report, 1)
         self.reduction_mode = AverageMode(reduction_mode)
         return self
 
     def to_bytes(self) -> bytearray:
-        report = struct.pack(
-            "<HHBH",
+        report = _FRAME_FORMAT_STRUCT.pack(
             self.start_element,
             self.end_element,
             self.reduction_mode.value,
@@ -192,36 +196,61 @@ class Calibration:
         return self._irr_norm[:-6]
 
     def from_bytes(self, raw: bytearray) -> Calibration:
-        while raw and raw[-1] == 0xFF:
-            raw.pop()
-        lines = raw.decode(ENCODING).replace("\t", "").replace("\r", "").split("\n")
-       
-        if len(lines) != CALIBRATION_LINES:
+        raw = raw.rstrip(b"\xff")
+        text = raw.decode(ENCODING).replace("\t", "").replace("\r", "")
+        # Position of every "\n", so the numeric blocks can be parsed straight
+        # out of the text instead of going through a list of ~11k line strings.
+        line_ends = np.flatnonzero(
+            np.frombuffer(text.encode(ENCODING), dtype=np.uint8) == ord("\n")
+        )
+
+        if len(line_ends) + 1 != CALIBRATION_LINES:
             raise ValueError(
-                f"Invalid calibration length.  Expected {CALIBRATION_LINES} lines, got {len(lines)}"
+                f"Invalid calibration length.  Expected {CALIBRATION_LINES} lines, got {len(line_ends) + 1}"
             )
-        header = lines[0].split()
+
+        def parse_lines(first: int, last: int) -> np.ndarray:
+            # Parses lines[first:last] as one float per line.
+            block = text[line_ends[first - 1] + 1 : line_ends[last - 1]]
+            try:
+                values = np.fromstring(block, dtype=np.float64, sep="\n")
+            except ValueError:
+                # Reparse with loadtxt, whose ValueError names the bad line.
+                values = np.loadtxt(io.StringIO(block), dtype=np.float64)
+            # Both parsers skip blank lines, so a short block only shows up here.
+            if len(values) != last - first:
+                raise ValueError(
+                    f"calibration block lines {first}-{last}: expected {last - first} values, got {len(values)}"
+                )
+            return values
+
+        header = text[: line_ends[0]].split()
         self.model = header[0]
         self.type = header[1]
         self.serial = int(header[2])
-        self.irr_scaler = float(lines[1])
-        self.irr_wave = float(lines[2])
-        self._wavelengths = np.asarray(lines[12:3665]).astype(float)
-        self._prnu_norm = np.asarray(lines[3666:7318]).astype(float)
-        self._prnu_norm = np.append(self._prnu_norm, [1.0, 1.0])  # for some reason lenghts dont match
-        self._irr_norm = np.asarray(lines[7320:10974]).astype(float)
+        self.irr_scaler = float(text[line_ends[0] + 1 : line_ends[1]])
+        self.irr_wave = float(text[line_ends[1] + 1 : line_ends[2]])
+        self._wavelengths = parse_lines(12, 3665)
+        self._prnu_norm = np.empty(3654)
+        self._prnu_norm[:3652] = parse_lines(3666, 7318)
+        self._prnu_norm[3652:] = 1.0  # for some reason lenghts dont match
+        self._irr_norm = parse_lines(7320, 10974)
         return self
 
     def to_bytes(self) -> bytearray:
-        report = [""] * CALIBRATION_LINES
-        report[0] = f"{self.model} {self.type} {self.serial}"
-        report[1] = f"{self.irr_scaler:.6e}"
-        report[2] = f"{self.irr_wave:.6f}"
-        report[12:3665] = self._wavelengths.astype(str)
-        report[3666:7320] = self._prnu_norm.astype(str)
-        report[7321:10975] = self._irr_norm.astype(str)
-        report = "\n".join(report)
-        return bytearray(report, encoding=ENCODING)
+        # Written block by block: header on lines 0-2, wavelengths from line 12,
+        # prnu from line 3666 and irr from line 7321, blank lines in between.
+        report = io.StringIO()
+        report.write(f"{self.model} {self.type} {self.serial}\n")
+        report.write(f"{self.irr_scaler:.6e}\n")
+        report.write(f"{self.irr_wave:.6f}\n")
+        report.write("\n" * 9)
+        report.write("\n".join(map(repr, self._wavelengths.tolist())))
+        report.write("\n\n")
+        report.write("\n".join(map(repr, self._prnu_norm.tolist())))
+        report.write("\n\n")
+        report.write("\n".join(map(repr, self._irr_norm.tolist())))
+        return bytearray(report.getvalue(), encoding=ENCODING)
 
     def from_file(self, file_path: str) -> Calibration:
         with open(file_path, "rb") as f:
@@ -230,3 +259,28 @@ class Calibration:
     def to_file(self, file_path: str) -> None:
         with open(file_path, "wb") as f:
             f.write(self.to_bytes())
+
+    def from_npz(self, file_path: str) -> Calibration:
+        with np.load(file_path) as cached:
+            self.model = str(cached["model"])
+            self.type = str(cached["type"])
+            self.serial = int(cached["serial"])
+            self.irr_scaler = float(cached["irr_scaler"])
+            self.irr_wave = float(cached["irr_wave"])
+            self._wavelengths = cached["wavelengths"]
+            self._prnu_norm = cached["prnu_norm"]
+            self._irr_norm = cached["irr_norm"]
+        return self
+
+    def to_npz(self, file_path: str) -> None:
+        np.savez(
+            file_path,
+            model=self.model,
+            type=self.type,
+            serial=self.serial,
+            irr_scaler=self.irr_scaler,
+            irr_wave=self.irr_wave,
+            wavelengths=self._wavelengths,
+            prnu_norm=self._prnu_norm,
+            irr_norm=self._irr_norm,
+        )
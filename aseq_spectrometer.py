@@ -5,14 +5,23 @@ Modified to work with libusb-win32 driver
 pre-req:
     pip install numpy
     pip install pyusb
+
+optional:
+    pip install numba  (compiled irradiance calibration kernel)
 """
 from __future__ import annotations
 
+import array
+import datetime
+import glob
 import logging
 import math
+import os
 import struct
+import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from types import TracebackType
 from typing import Optional, Type
 
@@ -22,14 +31,66 @@ import numpy as np
 
 from aseq_datastructures import *
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 LOGGER = logging.getLogger(__name__)
 
 # USB endpoint addresses
 EP_OUT = 0x02  # Endpoint for sending data to device
 EP_IN = 0x81   # Endpoint for receiving data from device
 
+# Parsed calibrations, one file per serial number
+CALIBRATION_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aseq")
+
+# Precompiled layouts for the per-packet hot paths
+_GET_FRAME_REQUEST = struct.Struct("<BBHHB")
+_READ_FLASH_REQUEST = struct.Struct("<BBIB")
+
+# Packet layouts for viewing a whole multi-packet reply as one record array
+_FRAME_PACKET = np.dtype(
+    [
+        ("reply", "u1"),
+        ("offset", "<u2"),
+        ("remaining", "u1"),
+        ("pixels", "<u2", (NUM_OF_PIXELS_IN_PACKET,)),
+    ]
+)
+_FLASH_PACKET = np.dtype(
+    [
+        ("reply", "u1"),
+        ("offset", "<u2"),
+        ("remaining", "u1"),
+        ("payload", "u1", (PACKET_SIZE_BYTES - 4,)),
+    ]
+)
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, fastmath=True)
+    def _apply_irr(raw, ratio, inv_scale, out):
+        """Single pass over the spectrum, no intermediate arrays."""
+        for i in range(raw.shape[0]):
+            out[i] = raw[i] * ratio[i] * inv_scale
+        return out
+
+    @njit(cache=True, fastmath=True)
+    def _apply_irr_baseline(raw, baseline, ratio, inv_scale, out):
+        """Baseline subtraction fused into the same pass."""
+        for i in range(raw.shape[0]):
+            out[i] = (raw[i] - baseline[i]) * ratio[i] * inv_scale
+        return out
+
 
 class LR1:
+    # Raw status values, for polling loops that skip building a Status flag
+    _IDLE = int(Status.idle)
+    _IN_PROGRESS = int(Status.in_progress)
+
     @classmethod
     def discover(cls, target_serial_no: str = None) -> LR1:
         """Find and return the first ASEQ LR1 spectrometer"""
@@ -48,15 +109,20 @@ class LR1:
         self.parameters = None
         self.frame_format = None
         self.calibration: Calibration = None
+        self._irr_ratio = None  # irr_norm / prnu_norm, cached per calibration
+        self._rx_buffers = {}  # reusable read buffers, keyed by size
+        self._parameters_on_device = None  # last parameter payload the device holds
         self.external_trigger = False
         
     def __str__(self) -> str:
-        serial = "unknown"
+        serial = self._serial_number() or "unknown"
+        return f"Spectrometer [{serial}]: {'' if self.connected else 'dis'}connected"
+
+    def _serial_number(self) -> Optional[str]:
         try:
-            serial = usb.util.get_string(self.device, self.device.iSerialNumber)
+            return usb.util.get_string(self.device, self.device.iSerialNumber)
         except:
-            pass
-        return f"Spectrometer [{serial}]: {'' if self.connected else 'dis'}connected"
+            return None
 
     def __enter__(self) -> LR1:
         self._open()
@@ -125,13 +191,22 @@ class LR1:
         self.parameters = None
         self.frame_format = None
         self.calibration = None
+        self._irr_ratio = None
+        self._parameters_on_device = None
         LOGGER.debug(f"Device Closed")
 
-    def _receive(self, correct_reply: ReplyCode, timeout_ms: int) -> list:
+    def _read_into_buffer(self, size: int, timeout_ms: int) -> memoryview:
+        """Read up to size bytes into a reusable buffer. Valid until the next read."""
+        buffer = self._rx_buffers.get(size)
+        if buffer is None:
+            buffer = self._rx_buffers[size] = array.array("B", bytes(size))
+        count = self.device.read(EP_IN, buffer, timeout_ms)
+        return memoryview(buffer)[:count]
+
+    def _receive(self, correct_reply: ReplyCode, timeout_ms: int) -> memoryview:
         """Read response from device"""
         try:
-            reply = self.device.read(EP_IN, PACKET_SIZE_BYTES, timeout_ms)
-            reply = list(reply)
+            reply = self._read_into_buffer(PACKET_SIZE_BYTES, timeout_ms)
             if reply[0] == correct_reply.value:
                 return reply
             else:
@@ -139,15 +214,44 @@ class LR1:
         except usb.core.USBError as e:
             raise OSError(f"USB read error: {e}")
 
+    def _receive_packets(
+        self,
+        correct_reply: ReplyCode,
+        packet_count: int,
+        timeout_ms: int,
+    ) -> memoryview:
+        """Read several consecutive packets using as few USB transfers as possible"""
+        bytes_expected = packet_count * PACKET_SIZE_BYTES
+        try:
+            replies = self._read_into_buffer(bytes_expected, timeout_ms)
+            if len(replies) < bytes_expected:
+                replies = bytearray(replies)
+                while len(replies) < bytes_expected:
+                    replies += self.device.read(
+                        EP_IN, bytes_expected - len(replies), timeout_ms
+                    )
+        except usb.core.USBError as e:
+            raise OSError(f"USB read error: {e}")
+        for packet_start in range(0, bytes_expected, PACKET_SIZE_BYTES):
+            if replies[packet_start] != correct_reply.value:
+                raise OSError(
+                    f"Incorrect reply: expected {correct_reply.value}, got {replies[packet_start]}"
+                )
+        return replies
+
+    def _check_remaining_packets(self, remaining: np.ndarray) -> None:
+        """Each packet must count down the packets still to come, ending at 0"""
+        if (remaining >= REMAINING_PACKETS_ERROR).any():
+            raise ValueError("Device error when sending packets.")
+        if not np.array_equal(remaining, np.arange(len(remaining) - 1, -1, -1)):
+            raise OSError("Remaining packets error.  Packet dropped?")
+
     def send(self, report: bytes) -> None:
         """Send command to device"""
         try:
-            # Convert to bytes if needed
-            if isinstance(report, list):
-                report = bytes(report)
-            
             # HID reports typically don't include the report ID in USB interrupt transfers
-            # Remove the first byte (report ID) if it's 0
+            # Drop the first byte (report ID) if it's 0, without copying the report
+            report = memoryview(report)
             if len(report) > 0 and report[0] == ZERO_REPORT_ID:
                 report = report[1:]
             
@@ -160,69 +264,82 @@ class LR1:
         report: bytes,
         correct_reply: int,
         timeout_ms: int,
-    ) -> list:
+    ) -> memoryview:
         self.send(report)
         results = self._receive(correct_reply, timeout_ms)
         return results
 
     def get_status(self) -> Status:
-        report = [ZERO_REPORT_ID, RequestCode.status.value, 0x00]
+        self.status = Status(self._get_status_raw())
+        return self.status
+
+    def _get_status_raw(self) -> int:
+        """Status byte as a plain int. Does not update self.status."""
+        report = bytearray([ZERO_REPORT_ID, RequestCode.status.value, 0x00])
         reply = self._send_and_receive(report, ReplyCode.status, STANDARD_TIMEOUT_MS)
-        self.status = Status(reply[1])
         self.frames_in_mem = int.from_bytes(reply[2:4], byteorder="little")
-        return self.status
+        return reply[1]
 
     def reset(self) -> None:
-        report = [ZERO_REPORT_ID, RequestCode.reset.value]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.reset.value])
         self.send(report)
+        self._parameters_on_device = None
         time.sleep(0.1)  # Give device time to reset
         LOGGER.debug(f"Device Reset")
 
     def detach(self) -> None:
-        report = [ZERO_REPORT_ID, RequestCode.detach.value]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.detach.value])
         self.send(report)
         LOGGER.debug(f"Device Detached")
 
     def get_parameters(self) -> Parameters:
         LOGGER.debug("Loading Parameters")
-        report = [
-            ZERO_REPORT_ID,
-            RequestCode.get_acquisition_parameters.value,
-            0x00,
-        ]
+        report = bytearray(
+            [
+                ZERO_REPORT_ID,
+                RequestCode.get_acquisition_parameters.value,
+                0x00,
+            ]
+        )
         reply = self._send_and_receive(
             report,
             ReplyCode.get_acquisition_parameters,
             STANDARD_TIMEOUT_MS,
         )
         self.parameters = Parameters().from_bytes(reply)
+        self._parameters_on_device = self.parameters.to_bytes()
         return self.parameters
 
     def set_parameters(self) -> None:
         LOGGER.debug("Setting Parameters")
-        report = [ZERO_REPORT_ID, RequestCode.set_acquisition_parameters.value]
-        report += self.parameters.to_bytes()
+        payload = self.parameters.to_bytes()
+        report = bytearray([ZERO_REPORT_ID, RequestCode.set_acquisition_parameters.value])
+        report += payload
         _ = self._send_and_receive(
             report,
             ReplyCode.set_acquisition_parameters,
             STANDARD_TIMEOUT_MS,
         )
         time.sleep(PARAMETER_SET_DELAY_S)
+        self._parameters_on_device = payload
 
     def set_exposure_ms(self, exposure_ms: int) -> None:
         LOGGER.debug(f"Setting exposure to {exposure_ms} ms")
         self.parameters.exposure_time_ms = exposure_ms
-        report = [ZERO_REPORT_ID, RequestCode.set_exposure.value]
-        report += self.parameters.to_bytes()[-4:]
+        exposure = self.parameters.to_bytes()[-4:]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.set_exposure.value])
+        report += exposure
         _ = self._send_and_receive(
             report,
             ReplyCode.set_exposure,
             STANDARD_TIMEOUT_MS,
         )
+        if self._parameters_on_device is not None:
+            self._parameters_on_device = self._parameters_on_device[:-4] + exposure
 
     def get_frame_format(self) -> FrameFormat:
         LOGGER.debug("Getting Frame Format")
-        report = [ZERO_REPORT_ID, RequestCode.get_frame_format.value]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.get_frame_format.value])
         reply = self._send_and_receive(
             report,
             ReplyCode.get_frame_format,
@@ -233,7 +350,7 @@ class LR1:
 
     def set_frame_format(self) -> None:
         LOGGER.debug("Setting Frame Format")
-        report = [ZERO_REPORT_ID, RequestCode.set_frame_format.value]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.set_frame_format.value])
         report += self.frame_format.to_bytes()
         _ = self._send_and_receive(
             report,
@@ -242,12 +359,14 @@ class LR1:
         )
 
     def set_external_trigger(self, mode: TriggerMode, slope: TriggerSlope) -> None:
-        report = [
-            ZERO_REPORT_ID,
-            RequestCode.set_external_trigger.value,
-            mode.value,
-            slope.value,
-        ]
+        report = bytearray(
+            [
+                ZERO_REPORT_ID,
+                RequestCode.set_external_trigger.value,
+                mode.value,
+                slope.value,
+            ]
+        )
         reply = self._send_and_receive(
             report,
             ReplyCode.set_external_trigger,
@@ -276,19 +395,19 @@ class LR1:
 
     def software_trigger(self) -> None:
         LOGGER.debug("Software Trigger")
-        report = [ZERO_REPORT_ID, RequestCode.set_software_trigger.value]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.set_software_trigger.value])
         self.send(report)
 
     def clear_memory(self) -> None:
         LOGGER.debug(f"Clearing Memory")
-        report = [ZERO_REPORT_ID, RequestCode.clear_memory.value]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.clear_memory.value])
         _ = self._send_and_receive(
             report,
             ReplyCode.clear_memory,
             STANDARD_TIMEOUT_MS,
         )
 
-    def get_raw_frame(self, buffer_index: int = 0, offset: int = 0) -> list:
+    def get_raw_frame(self, buffer_index: int = 0, offset: int = 0) -> np.array:
         LOGGER.debug(f"Reading Frame from index {buffer_index}")
         pixels_in_frame = self.frame_format.pixels_in_frame
         packets_to_get = int(math.ceil(pixels_in_frame / NUM_OF_PIXELS_IN_PACKET))
@@ -296,8 +415,7 @@ class LR1:
         if packets_to_get > MAX_PACKETS_IN_FRAME:
             raise ValueError("Too many packets to get")
 
-        report = struct.pack(
-            "<BBHHB",
+        report = _GET_FRAME_REQUEST.pack(
             ZERO_REPORT_ID,
             RequestCode.get_frame.value,
             offset,
@@ -306,41 +424,45 @@ class LR1:
         )
 
         self.send(report)
+        replies = self._receive_packets(
+            ReplyCode.get_frame,
+            packets_to_get,
+            STANDARD_TIMEOUT_MS * max(1, packets_to_get // 10),
+        )
 
-        frame_buffer = [0] * pixels_in_frame
-        packets_remaining = MAX_PACKETS_IN_FRAME
-        packets_received = 0
-        while packets_remaining > 0:
-            reply = self._receive(ReplyCode.get_frame, STANDARD_TIMEOUT_MS)
-            packets_received += 1
-
-            data = struct.unpack(
-                "<BHB" + "H" * NUM_OF_PIXELS_IN_PACKET, bytearray(reply)
-            )
-            pixel_offset = data[1]
-            packets_remaining = data[2]
-            pixels = data[3:]
-
-            if packets_remaining >= REMAINING_PACKETS_ERROR:
-                raise ValueError("Device error when sending packets.")
-
-            if not packets_remaining == (packets_to_get - packets_received):
-                raise OSError("Remaining packets error.  Packet dropped?")
-
-            end_offset = pixel_offset + len(pixels)
-            frame_buffer[pixel_offset:end_offset] = pixels
+        # The last packet may run past pixels_in_frame, so size the buffer by packets.
+        frame_buffer = np.zeros(
+            max(pixels_in_frame, packets_to_get * NUM_OF_PIXELS_IN_PACKET),
+            dtype=np.int64,
+        )
+        packets = np.frombuffer(replies, dtype=_FRAME_PACKET)
+        self._check_remaining_packets(packets["remaining"])
+        pixel_index = (
+            packets["offset"][:, None].astype(np.intp)
+            + np.arange(NUM_OF_PIXELS_IN_PACKET)
+        )
+        frame_buffer[pixel_index] = packets["pixels"]
 
         data = frame_buffer[32 : pixels_in_frame - 14]
         LOGGER.debug(f"Read {len(data)} pixels")
-        return np.array(data)
+        return data
 
     def grab_one(self, exposure_ms=None) -> np.array:
         if exposure_ms:
             self.parameters.exposure_time_ms = exposure_ms
-        self.set_parameters()
+        # Setting parameters costs a round-trip plus PARAMETER_SET_DELAY_S, so
+        # back-to-back grabs only pay it when something actually changed.
+        if self.parameters.to_bytes() != self._parameters_on_device:
+            self.set_parameters()
         self.clear_memory()
         self.software_trigger()
-        while self.get_status() == Status.in_progress:
+        # The capture can't finish before the exposure has elapsed, so wait that
+        # long up front instead of spending USB round-trips polling the status.
+        time.sleep(
+            self.parameters.exposure_time_ms * self.parameters.scan_count / 1000
+            + CAPTURE_MARGIN_S
+        )
+        while self._get_status_raw() == self._IN_PROGRESS:
             LOGGER.debug("Waiting for capture to finish")
             time.sleep(self.parameters.exposure_time_ms / 1000)
         raw_read = self.get_raw_frame()
@@ -371,14 +493,15 @@ class LR1:
         payload_size = PACKET_SIZE_BYTES - 4
         packets_to_get = int(math.ceil(bytes_to_read / payload_size))
 
-        buffer = [0] * packets_to_get * payload_size
+        buffer = bytearray(packets_to_get * payload_size)
+        buffer_np = np.frombuffer(buffer, dtype=np.uint8)
+        payload_index = np.arange(payload_size)
         offset_increment = 0
         LOGGER.debug(f"Reading {bytes_to_read} bytes from flash")
         while packets_to_get:
             packet_batch = int(min(packets_to_get, FLASH_MAX_READ_PACKETS))
 
-            report = struct.pack(
-                "<BBIB",
+            report = _READ_FLASH_REQUEST.pack(
                 ZERO_REPORT_ID,
                 RequestCode.read_flash.value,
                 abs_offset + offset_increment,
@@ -386,36 +509,30 @@ class LR1:
             )
             self.send(report)
             time.sleep(0.01)
-
-            packets_remaining = packet_batch
-            packets_received = 0
-            while packets_remaining > 0:
-                reply = self._receive(ReplyCode.read_flash, STANDARD_TIMEOUT_MS)
-                packets_received += 1
-
-                data = struct.unpack("<BHB" + "B" * payload_size, bytearray(reply))
-                local_offset = data[1]
-                packets_remaining = data[2]
-                data_frame = data[3:]
-
-                if packets_remaining >= REMAINING_PACKETS_ERROR:
-                    raise ValueError("Device error when sending packets.")
-
-                if not packets_remaining == (packet_batch - packets_received):
-                    raise OSError("Remaining packets error.  Packet dropped?")
-
-                start_offset = offset_increment + local_offset
-                end_offset = start_offset + len(data_frame)
-                buffer[start_offset:end_offset] = data_frame
+            replies = self._receive_packets(
+                ReplyCode.read_flash,
+                packet_batch,
+                STANDARD_TIMEOUT_MS * max(1, packet_batch // 10),
+            )
+            packets = np.frombuffer(replies, dtype=_FLASH_PACKET)
+            self._check_remaining_packets(packets["remaining"])
+            byte_index = (
+                offset_increment
+                + packets["offset"][:, None].astype(np.intp)
+                + payload_index
+            )
+            buffer_np[byte_index] = packets["payload"]
 
             packets_to_get = max(0, packets_to_get - packet_batch)
             offset_increment += packet_batch * payload_size
 
-        return bytearray(buffer[:bytes_to_read])
+        del buffer_np  # release the export so the bytearray can be resized
+        del buffer[bytes_to_read:]
+        return buffer
 
     def erase_flash(self) -> None:
         LOGGER.debug("Erasing Flash")
-        report = [ZERO_REPORT_ID, RequestCode.erase_flash.value]
+        report = bytearray([ZERO_REPORT_ID, RequestCode.erase_flash.value])
         _ = self._send_and_receive(
             report,
             ReplyCode.erase_flash,
@@ -454,31 +571,98 @@ class LR1:
     def get_calibration(self) -> Calibration:
         LOGGER.debug("Loading calibration")
         BYTES_TO_READ = 97089
+        serial = self._serial_number()
+        cache_path = _calibration_cache_path(serial) if serial else None
         try:
-            raw_read = self.read_flash(BYTES_TO_READ, abs_offset=0)
-            self.calibration = Calibration().from_bytes(raw_read)
+            self.calibration = None
+            if cache_path and os.path.exists(cache_path):
+                try:
+                    self.calibration = Calibration().from_npz(cache_path)
+                    LOGGER.debug(f"Calibration read from cache {cache_path}")
+                except Exception as e:
+                    LOGGER.warning(f"Ignoring unreadable calibration cache. {e}")
+            if self.calibration is None:
+                raw_read = self.read_flash(BYTES_TO_READ, abs_offset=0)
+                self.calibration = Calibration().from_bytes(raw_read)
+                if cache_path:
+                    try:
+                        os.makedirs(CALIBRATION_CACHE_DIR, exist_ok=True)
+                        self.calibration.to_npz(cache_path)
+                    except OSError as e:
+                        LOGGER.warning(f"Unable to cache calibration. {e}")
+            self._irr_ratio = (
+                self.calibration.irr_norm / self.calibration.prnu_norm
+            ).astype(np.float32)
             LOGGER.debug("Calibration loaded")
             return self.calibration
         except Exception as e:
             LOGGER.error(f"Unable to load calibration. {e}")
 
-    def apply_irradiance_calibration(self, raw_spectra: np.array) -> np.array:
-        return np.multiply(raw_spectra, self.calibration.irr_norm) / (
-            self.calibration.prnu_norm
-            * self.calibration.irr_scaler
-            * (self.parameters.exposure_time_ms * 100)
+    def apply_irradiance_calibration(
+        self, raw_spectra: np.array, baseline: np.array = None, out: np.array = None
+    ) -> np.array:
+        """
+        Calibrate raw_spectra, subtracting baseline first if one is given.
+        The result is written to out (float32, same shape) when provided.
+        """
+        raw_spectra = np.asarray(raw_spectra)
+        inv_scale = np.float32(
+            1.0 / (self.calibration.irr_scaler * self.parameters.exposure_time_ms * 100.0)
         )
+        if out is None:
+            out = np.empty(raw_spectra.shape, dtype=np.float32)
+        if baseline is not None:
+            baseline = np.asarray(baseline)
+        # The kernels index every array by raw_spectra's length, unchecked
+        for name, operand in (("calibration", self._irr_ratio), ("out", out), ("baseline", baseline)):
+            if operand is not None and operand.shape != raw_spectra.shape:
+                raise ValueError(
+                    f"Shape mismatch: spectrum is {raw_spectra.shape}, {name} is {operand.shape}"
+                )
+        if NUMBA_AVAILABLE:
+            if baseline is None:
+                return _apply_irr(raw_spectra, self._irr_ratio, inv_scale, out)
+            return _apply_irr_baseline(
+                raw_spectra, baseline, self._irr_ratio, inv_scale, out
+            )
+        if baseline is None:
+            np.multiply(raw_spectra, self._irr_ratio, out=out)
+        else:
+            # In float, so integer spectra can't wrap below the baseline
+            np.subtract(raw_spectra, baseline, out=out, dtype=np.float32)
+            out *= self._irr_ratio
+        out *= inv_scale
+        return out
 
 # --- END OF LR1 CLASS ---
 
 
+def _calibration_cache_path(serial: str) -> str:
+    return os.path.join(CALIBRATION_CACHE_DIR, f"cal_{serial}.npz")
+
+
+def invalidate_calibration_cache(serial: str = None) -> None:
+    """Delete the cached calibration for one serial number, or for all devices"""
+    if serial is None:
+        paths = glob.glob(os.path.join(CALIBRATION_CACHE_DIR, "cal_*.npz"))
+    else:
+        paths = [_calibration_cache_path(serial)]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
 # --- connect_with_retry IS NOW A GLOBAL FUNCTION (CORRECTED) ---
-def connect_with_retry():
+def connect_with_retry(stop_event: threading.Event = None) -> Optional[LR1]:
     """
     Continuously try to discover the LR1 spectrometer.
-    This will block until a connection is successful.
+    This will block until a connection is successful, or return None if
+    stop_event is set first.
     """
-    while True:
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
         try:
             # Try to find the device
             spectro = LR1.discover()
@@ -487,24 +671,30 @@ def connect_with_retry():
         except OSError as e:
             # If not found, log it and wait 5 seconds to retry
             LOGGER.info(f"Connection failed: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
+            stop_event.wait(5)
+    return None
 
 
-# Demo Example Usage:
-if __name__ == "__main__":
-    import datetime
-    import os
-    
-    logging.basicConfig(level=logging.INFO)
-    
+def acquire_on_external_trigger(
+    base_output_dir: str = "output",
+    exposure_ms: int = 50,
+    stop_event: threading.Event = None,
+) -> None:
+    """
+    Save a frame to base_output_dir/<MMYY>/<timestamp>.txt for every external
+    trigger. Runs until stop_event is set, or forever if none is given.
+    """
+    stop_event = stop_event or threading.Event()
+
     # Create the base output directory if it doesn't exist
-    base_output_dir = 'output'
     os.makedirs(base_output_dir, exist_ok=True)
 
     # --- THIS IS THE KEY CHANGE ---
     print("Attempting to connect to spectrometer... (will retry on failure)")
     # This new function will loop until it finds a spectrometer
-    spectro_device = connect_with_retry()
+    spectro_device = connect_with_retry(stop_event)
+    if spectro_device is None:
+        return
     # --- END OF CHANGE ---
     
     # Once connected, the 'with' statement opens it and the rest
@@ -517,7 +707,6 @@ if __name__ == "__main__":
         spectro.set_external_trigger(TriggerMode.enabled, TriggerSlope.rising)
         
         # Set exposure time
-        exposure_ms = 50
         spectro.set_exposure_ms(exposure_ms)
         print(f"Exposure time set to {exposure_ms} ms")
         
@@ -525,24 +714,36 @@ if __name__ == "__main__":
         wavelengths = spectro.calibration.wavelengths if spectro.calibration else None
         
         print("\nWaiting for external trigger signal...")
-        print("Press Ctrl+C to stop\n")
         
+        def save_scan(filename, frame, scan_count):
+            if wavelengths is not None:
+                data = np.column_stack((wavelengths, frame))
+                np.savetxt(filename, data, delimiter=',', fmt='%.6f,%d')
+            else:
+                np.savetxt(filename, frame, delimiter=',', fmt='%d')
+            
+            print(f"Scan {scan_count}: Saved to {filename} (Min: {frame.min()}, Max: {frame.max()}, Mean: {frame.mean():.1f})")
+        
+        # Files are written on a worker thread so the next capture can be armed
+        # right away. Pending writes are finished before returning.
+        writer = ThreadPoolExecutor(max_workers=1)
         scan_count = 0
         try:
-            while True:
+            while not stop_event.is_set():
                 # Clear memory before waiting for trigger
                 spectro.clear_memory()
                 
                 # Wait for trigger and capture
-                status = spectro.get_status()
-                while status == Status.idle:
-                    time.sleep(0.01)  # Poll every 10ms
-                    status = spectro.get_status()
+                status = spectro._get_status_raw()
+                while status == LR1._IDLE:
+                    if stop_event.wait(0.01):  # Poll every 10ms
+                        return
+                    status = spectro._get_status_raw()
                 
                 # Wait for capture to complete
-                while status == Status.in_progress:
+                while status == LR1._IN_PROGRESS:
                     time.sleep(exposure_ms / 1000)
-                    status = spectro.get_status()
+                    status = spectro._get_status_raw()
                 
                 # Read the frame
                 frame = spectro.get_raw_frame()
@@ -560,15 +761,19 @@ if __name__ == "__main__":
                 
                 
                 # Save to .txt file
-                if wavelengths is not None:
-                    data = np.column_stack((wavelengths, frame))
-                    np.savetxt(filename, data, delimiter=',', fmt='%.6f,%d')
-                else:
-                    np.savetxt(filename, frame, delimiter=',', fmt='%d')
-                
-                print(f"Scan {scan_count}: Saved to {filename} (Min: {frame.min()}, Max: {frame.max()}, Mean: {frame.mean():.1f})")
+                writer.submit(save_scan, filename, frame, scan_count)
                 
-        except KeyboardInterrupt:
+        finally:
+            writer.shutdown(wait=True)
             print(f"\n\nStopped. Total scans captured: {scan_count}")
-            print(f"Files saved in 'output/' directory, sorted by month.")
+            print(f"Files saved in '{base_output_dir}' directory, sorted by month.")
 
+
+# Demo Example Usage:
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Press Ctrl+C to stop\n")
+    try:
+        acquire_on_external_trigger('output')
+    except KeyboardInterrupt:
+        pass
@@ -4,11 +4,12 @@ from bokeh.plotting import figure, curdoc
 from bokeh.models import Slider, Toggle, Button, ColumnDataSource
 from bokeh.layouts import column
 from bokeh.io import show
-from bokeh.driving import linear
 
 from aseq_spectrometer import LR1, TriggerMode, TriggerSlope
 
+from functools import partial
 import numpy as np
+import threading
 import time
 
 # # Simulate the get_one() function
@@ -23,6 +24,55 @@ import time
 #     signal *= (exposure_time / 50)  # Amplify or dampen the signal based on exposure time
 #     return wavelength, signal
 
+class AcquisitionWorker(threading.Thread):
+    """Grabs frames in the background and keeps only the latest one.
+
+    Every new frame schedules a single next-tick callback on the Bokeh document,
+    so the document thread never blocks on the spectrometer.
+    """
+
+    def __init__(self, spectro, exposure_ms, doc, on_frame):
+        super().__init__(daemon=True)
+        self.spectro = spectro
+        self.exposure_ms = exposure_ms
+        self.external_trigger = False
+        self.spectro_lock = threading.Lock()  # held for every spectrometer call
+        self._doc = doc
+        self._on_frame = on_frame
+        self._latest = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            with self.spectro_lock:
+                if self.external_trigger:
+                    self.spectro.set_exposure_ms(self.exposure_ms)
+                    self.spectro.clear_memory() #this is a little hacky because it gets called every second ev, but since 
+                    frame = self.spectro.get_raw_frame()
+                else:
+                    frame = self.spectro.grab_one(self.exposure_ms)
+            with self._lock:
+                pending = self._latest is not None
+                self._latest = frame
+            if not pending:
+                self._doc.add_next_tick_callback(partial(self._on_frame, self))
+            if self.external_trigger:
+                # Give the trigger a second to arrive before reading again
+                self._stop_event.wait(1.0)
+
+    def set_exposure_ms(self, exposure_ms):
+        self.exposure_ms = exposure_ms
+        self.take_latest()  # a frame at the old exposure is stale now
+
+    def take_latest(self):
+        with self._lock:
+            frame, self._latest = self._latest, None
+        return frame
+
+    def stop(self):
+        self._stop_event.set()
+
 #load spectromerter
 spectro =  LR1.discover()
 spectro._open()
@@ -50,42 +100,81 @@ calibrate_toggle = Toggle(label="Show Calibrated Result", button_type="success",
 baseline_toggle = Toggle(label="Subtract Baseline", button_type="success", active=False)
 baseline_button = Button(label="Capture Baseline", button_type="success")
 
+# Baseline drift is low-frequency, so the captured baseline is mean-pooled over
+# BASELINE_POOL pixels and interpolated back to full resolution once.
+BASELINE_POOL = 8
+
+def smooth_baseline(raw):
+    n = len(raw) // BASELINE_POOL * BASELINE_POOL
+    pooled = raw[:n].reshape(-1, BASELINE_POOL).mean(axis=1)
+    centers = np.arange(len(pooled)) * BASELINE_POOL + (BASELINE_POOL - 1) / 2
+    return np.interp(np.arange(len(raw)), centers, pooled).astype(np.float32)
+
 # Function to capture a baseline (for example, reset signal to zero)
 def capture_baseline():
     global baseline_signal
-    baseline_signal = spectro.grab_one(exposure_time)
+    with worker.spectro_lock:
+        raw = spectro.grab_one(worker.exposure_ms)
+    baseline_signal = smooth_baseline(raw)
 
 def external_trigger_toggle_callback(attr):
-    if external_trigger_toggle.active:
-        spectro.set_external_trigger(TriggerMode.enabled, TriggerSlope.rising )
-    else:
-        spectro.set_external_trigger(TriggerMode.disabled, TriggerSlope.rising )
-
-# Function to simulate periodic updates (every second)
-@linear()
-def periodic_update(step):
-    exposure_time = exposure_slider.value
-    if external_trigger_toggle.active:
-        spectro.set_exposure_ms(exposure_time)
-        spectro.clear_memory() #this is a little hacky because it gets called every second ev, but since 
-        signal = spectro.get_raw_frame()
-    else:
-        signal = spectro.grab_one(exposure_time)
-    if baseline_toggle.active:
-        signal = signal - baseline_signal
-    if calibrate_toggle.active:
-        signal = spectro.apply_irradiance_calibration(signal)
-    source.data = {'wavelength': wavelength, 'signal': signal}
+    with worker.spectro_lock:
+        if external_trigger_toggle.active:
+            spectro.set_external_trigger(TriggerMode.enabled, TriggerSlope.rising )
+        else:
+            spectro.set_external_trigger(TriggerMode.disabled, TriggerSlope.rising )
+        worker.external_trigger = external_trigger_toggle.active
+
+# Slider changes are coalesced: only the last value within 50 ms is applied
+pending_exposure_callback = None
+
+def apply_exposure():
+    global pending_exposure_callback
+    pending_exposure_callback = None
+    worker.set_exposure_ms(exposure_slider.value)
+
+def exposure_slider_callback(attr, old, new):
+    global pending_exposure_callback
+    if pending_exposure_callback is not None:
+        curdoc().remove_timeout_callback(pending_exposure_callback)
+    pending_exposure_callback = curdoc().add_timeout_callback(apply_exposure, 50)
+
+# Processed spectra alternate between two preallocated buffers, so the one
+# the plot currently holds is never overwritten in place.
+display_buffers = [np.empty(len(signal), dtype=np.float32) for _ in range(2)]
+display_index = 0
+
+# Runs on the document thread whenever the worker has a new frame
+def update_plot(worker):
+    global display_index
+    signal = worker.take_latest()
+    if signal is None:
+        return
+    baseline = baseline_signal if baseline_toggle.active else None
+    if calibrate_toggle.active or baseline is not None:
+        out = display_buffers[display_index]
+        display_index ^= 1
+        if calibrate_toggle.active:
+            # Baseline subtraction happens inside the same pass over the spectrum
+            signal = spectro.apply_irradiance_calibration(signal, baseline, out=out)
+        else:
+            signal = np.subtract(signal, baseline, out=out)
+    # The wavelength column never changes, so only the signal is resent
+    source.data.update(signal=signal)
+
+worker = AcquisitionWorker(spectro, exposure_time, curdoc(), update_plot)
 
 # Add callbacks to the widgets
 baseline_button.on_click(capture_baseline)
 external_trigger_toggle.on_click(external_trigger_toggle_callback)
+exposure_slider.on_change('value_throttled', exposure_slider_callback)
 
 # Layout the components
 layout = column(exposure_slider, external_trigger_toggle, calibrate_toggle,baseline_toggle, baseline_button, p)
 
-# Add periodic updates every second
-curdoc().add_periodic_callback(periodic_update, 1000)
+# Acquire in the background; frames are pushed to the plot as they arrive
+worker.start()
+curdoc().on_session_destroyed(lambda session_context: worker.stop())
 
 # Add the layout to the current document
 curdoc().add_root(layout)
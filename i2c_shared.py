@@ -0,0 +1,38 @@
+"""I2C setup shared by the GUI and the hardware test scripts"""
+
+I2C_BUS = 1
+
+# The Pi's I2C bus defaults to 100 kHz; the DS3231 and MCP4725 both run at
+# 400 kHz, which cuts every transaction to about a quarter of the time.
+I2C_FAST_HZ = 400000
+
+_I2C = None
+
+
+def get_i2c():
+    """
+    Returns the Blinka I2C bus. Board detection and pin setup run on the
+    first call only; later callers in the same process share the bus.
+    """
+    global _I2C
+    if _I2C is None:
+        # Imported here so scripts that only need check_i2c_speed don't pay
+        # for Blinka's board detection
+        import board
+        import busio
+        _I2C = busio.I2C(board.SCL, board.SDA)
+    return _I2C
+
+
+def check_i2c_speed(bus=I2C_BUS):
+    """Warns if the I2C bus clock is below 400 kHz (read from the device tree)."""
+    path = f"/sys/class/i2c-adapter/i2c-{bus}/of_node/clock-frequency"
+    try:
+        with open(path, "rb") as f:
+            hz = int.from_bytes(f.read(4), "big")  # device-tree u32 cell
+    except OSError:
+        return  # not a Pi, or no device-tree node for this bus
+    if hz < I2C_FAST_HZ:
+        print(f"NOTE: I2C bus {bus} runs at {hz // 1000} kHz. Add "
+              f"'dtparam=i2c_arm_baudrate={I2C_FAST_HZ}' to /boot/firmware/config.txt "
+              "and reboot for faster transfers.")
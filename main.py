@@ -1,10 +1,13 @@
 import eel
+import base64
+import functools
 import threading
 import time
-import glob
 import os
-import pandas as pd
 import json
+import re
+import select
+import signal
 from scipy.signal import find_peaks
 import numpy as np
 import datetime
@@ -14,11 +17,28 @@ import psutil
 import sys
 import socket
 import subprocess
+import tempfile
+import zipfile
 import urllib.request
 import email.utils
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
+try:
+    # pyudev delivers USB hotplug events (Linux only, optional)
+    import pyudev
+except ImportError:
+    pyudev = None
+try:
+    # orjson serializes numpy arrays directly (optional: pip install orjson)
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    # numba compiles the scan peak finder (optional: pip install numba)
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 gdrive_upload_lock = threading.Lock()
+_gdrive_thread = None
 
 # --- RPi specific imports ---
 try:
@@ -26,8 +46,8 @@ try:
     import lgpio
     # Adafruit libraries for I2C DAC control
     import board
-    import busio
     import adafruit_mcp4725
+    from i2c_shared import get_i2c
     # ntplib is for syncing time over the internet
     import ntplib
     RPI_MODE = True
@@ -41,8 +61,43 @@ RELAY_PIN = 5
 BOOST_PIN = 13
 I2C_BUS = 1
 DS3231_ADDRESS = 0x68
+DS3231_CONTROL_REG = 0x0E
+RTC_SQW_PIN = None  # GPIO wired to the DS3231 SQW output; None polls the RTC over I2C instead
 MCP4725_ADDRESS = 0x60 # Default I2C address for the MCP4725
 
+# --- Paths ---
+# Resolved once at import; the data folder lives next to this script
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_OUTPUT_DIR = os.path.join(_SCRIPT_DIR, 'output')
+
+# --- CPU cores for the long-running threads ---
+# Core 0 is left to eel and Chromium, so UI load doesn't stretch spark timing
+OPERATION_CORE = 1
+SPECTROMETER_CORE = 2
+BACKGROUND_CORE = 3  # USB monitor/copy and Google Drive uploads
+
+# Renicing is refused for every thread once it has been refused for one
+_renice_denied = False
+
+def pin_current_thread(core, nice=None):
+    """Pins the calling thread to one core and optionally renices it (Linux only)."""
+    global _renice_denied
+    if not hasattr(os, 'sched_setaffinity') or core >= os.cpu_count():
+        return
+    tid = threading.get_native_id()
+    try:
+        os.sched_setaffinity(tid, {core})
+    except OSError as e:
+        print(f"Could not set CPU affinity: {e}")
+    if nice is None or _renice_denied:
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, nice)
+    except OSError as e:
+        # Negative values need root; warn once rather than on every operation
+        _renice_denied = True
+        print(f"Could not set thread priority to {nice}, leaving it unchanged: {e}")
+
 def load_config():
     """ Loads config.json. """
     config_path = "config.json"
@@ -59,68 +114,105 @@ def load_config():
 
 config = load_config()
 
-# --- Start ASEQ Spectrometer as separate process ---
-def start_spectrometer_process():
-    """Start the ASEQ spectrometer script as a separate process"""
-    try:
-        # Check if aseq_spectrometer.py exists
-        if os.path.exists('aseq_spectrometer.py'):
-            # Start the spectrometer script as a subprocess
-            spectrometer_process = subprocess.Popen(
-                [sys.executable, 'aseq_spectrometer.py'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1
-            )
-            
-            # Create a thread to monitor its output
-            def monitor_spectrometer_output():
-                for line in spectrometer_process.stdout:
-                    print(f"[SPECTROMETER] {line.strip()}")
-            
-            monitor_thread = threading.Thread(target=monitor_spectrometer_output, daemon=True)
-            monitor_thread.start()
-            
-            print("ASEQ Spectrometer process started successfully")
-            return spectrometer_process
-        else:
-            print("WARNING: aseq_spectrometer.py not found. Spectrometer features disabled.")
-            return None
-    except Exception as e:
-        print(f"Failed to start spectrometer process: {e}")
+# --- ASEQ Spectrometer acquisition, in-process ---
+try:
+    import aseq_spectrometer
+except ImportError as e:
+    print(f"WARNING: Spectrometer driver unavailable ({e}). Spectrometer features disabled.")
+    aseq_spectrometer = None
+
+spectrometer_stop = threading.Event()
+
+def start_spectrometer_thread():
+    """Run the external-trigger acquisition loop on a background thread"""
+    if aseq_spectrometer is None:
         return None
 
+    def acquisition_task():
+        pin_current_thread(SPECTROMETER_CORE)
+        try:
+            aseq_spectrometer.acquire_on_external_trigger(_OUTPUT_DIR, stop_event=spectrometer_stop)
+        except Exception as e:
+            print(f"[SPECTROMETER] Acquisition stopped: {e}")
+
+    spectrometer_thread = threading.Thread(target=acquisition_task, daemon=True)
+    spectrometer_thread.start()
+    print("ASEQ Spectrometer acquisition started")
+    return spectrometer_thread
+
 # --- RTC Helper Functions (using lgpio) ---
+# Lookup tables, so each conversion is a single byte index
+_BCD2DEC = bytes((b >> 4) * 10 + (b & 0x0F) for b in range(256))
+_DEC2BCD = bytes(((d // 10) << 4) | (d % 10) for d in range(100))
+
 def bcd_to_dec(bcd):
     """Convert Binary Coded Decimal to Decimal"""
-    return (bcd // 16 * 10) + (bcd % 16)
+    return _BCD2DEC[bcd]
 
 def dec_to_bcd(dec):
     """Convert Decimal to Binary Coded Decimal"""
-    return (dec // 10 * 16) + (dec % 10)
+    return _DEC2BCD[dec]
+
+# Register masks for the 7-byte DS3231 time frame: seconds, minutes, hours
+# (24h), weekday, day, month (century bit dropped), year
+_RTC_FRAME_MASKS = (0x7F, 0xFF, 0x3F, 0xFF, 0xFF, 0x1F, 0xFF)
+
+# The RTC handle stays open for the life of the process. Several threads
+# read the clock, so every use of the handle goes through _rtc_lock.
+_rtc_h = None
+_rtc_lock = threading.Lock()
+
+def _rtc_handle():
+    """Returns the open RTC handle, opening it on first use. Call with _rtc_lock held."""
+    global _rtc_h
+    if _rtc_h is None:
+        _rtc_h = lgpio.i2c_open(I2C_BUS, DS3231_ADDRESS)
+    return _rtc_h
+
+def _rtc_call(func, *args):
+    """
+    Runs an lgpio I2C function on the RTC handle. A bus error reopens the
+    handle and retries once, so a transient glitch doesn't leave it wedged.
+    """
+    global _rtc_h
+    with _rtc_lock:
+        try:
+            return func(_rtc_handle(), *args)
+        except (OSError, lgpio.error) as e:
+            print(f"RTC I2C error ({e}), reopening handle.")
+            try:
+                lgpio.i2c_close(_rtc_h)
+            except Exception:
+                pass
+            _rtc_h = None
+            return func(_rtc_handle(), *args)
+
+def close_rtc():
+    """Closes the RTC handle; the next access reopens it."""
+    global _rtc_h
+    with _rtc_lock:
+        if _rtc_h is not None:
+            try:
+                lgpio.i2c_close(_rtc_h)
+            except Exception as e:
+                print(f"Error closing RTC: {e}")
+            _rtc_h = None
 
 def get_rtc_datetime():
     """Reads the time from a DS3231 RTC module using lgpio."""
     if not RPI_MODE:
         return datetime.datetime.now()
-    h = None
     try:
-        h = lgpio.i2c_open(I2C_BUS, DS3231_ADDRESS)
-        count, time_data = lgpio.i2c_read_i2c_block_data(h, 0, 7)
-        lgpio.i2c_close(h)
+        count, time_data = _rtc_call(lgpio.i2c_read_i2c_block_data, 0, 7)
         if count == 7:
-            return datetime.datetime(
-                year=bcd_to_dec(time_data[6]) + 2000,
-                month=bcd_to_dec(time_data[5] & 0x1F),
-                day=bcd_to_dec(time_data[4]),
-                hour=bcd_to_dec(time_data[2] & 0x3F),
-                minute=bcd_to_dec(time_data[1]),
-                second=bcd_to_dec(time_data[0] & 0x7F)
-            )
+            # Decode the whole frame in one pass
+            second, minute, hour, _, day, month, year = [
+                _BCD2DEC[b & m] for b, m in zip(time_data, _RTC_FRAME_MASKS)
+            ]
+            return datetime.datetime(year + 2000, month, day, hour, minute, second)
         raise IOError(f"Expected 7 bytes from RTC, got {count}")
     except Exception as e:
-        if h: lgpio.i2c_close(h)
+        close_rtc()  # start from a fresh handle next time
         print(f"Error reading from RTC: {e}")
         return datetime.datetime.now()
 
@@ -129,28 +221,96 @@ def set_rtc_datetime(dt):
     if not RPI_MODE:
         print("Simulation mode: Cannot set RTC time.")
         return
-    h = None
     try:
-        time_data = [
-            dec_to_bcd(dt.second), dec_to_bcd(dt.minute), dec_to_bcd(dt.hour),
-            dec_to_bcd(dt.weekday() + 1), dec_to_bcd(dt.day),
-            dec_to_bcd(dt.month), dec_to_bcd(dt.year - 2000)
-        ]
-        h = lgpio.i2c_open(I2C_BUS, DS3231_ADDRESS)
-        lgpio.i2c_write_i2c_block_data(h, 0, time_data)
-        lgpio.i2c_close(h)
+        time_data = bytes((
+            _DEC2BCD[dt.second], _DEC2BCD[dt.minute], _DEC2BCD[dt.hour],
+            _DEC2BCD[dt.weekday() + 1], _DEC2BCD[dt.day], _DEC2BCD[dt.month],
+            _DEC2BCD[dt.year - 2000],
+        ))
+        _rtc_call(lgpio.i2c_write_i2c_block_data, 0, time_data)
+        rtc_clock.resync()
         print(f"RTC time set to: {dt.strftime('%Y-%m-%d %H:%M:%S')}")
     except Exception as e:
-        if h: lgpio.i2c_close(h)
+        close_rtc()
         print(f"Error setting RTC time: {e}")
 
+class RTCClock:
+    """
+    RTC time without an I2C read per call. The RTC is read once a minute and
+    the time in between is extrapolated from the monotonic clock.
+    If the DS3231 1 Hz square wave is wired to a GPIO, its edges count the
+    seconds instead and the RTC is only read when the count has to be seeded.
+    """
+    RESYNC_S = 60
+    SQW_TIMEOUT_S = 1.5  # no edge for this long: the square wave is not running
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._base = None
+        self._base_mono = None
+        self._sqw_callback = None
+        self._sqw_time = None
+        self._sqw_mono = None
+
+    def attach_sqw(self, gpio_h, pin):
+        """Enables the 1 Hz SQW output and counts its edges. Returns False if that fails."""
+        try:
+            # INTCN=0 and RS2:RS1=00 select the 1 Hz square wave
+            control = _rtc_call(lgpio.i2c_read_byte_data, DS3231_CONTROL_REG)
+            _rtc_call(lgpio.i2c_write_byte_data, DS3231_CONTROL_REG, control & ~0x1C)
+            # SQW is open drain
+            lgpio.gpio_claim_alert(gpio_h, pin, lgpio.FALLING_EDGE, lgpio.SET_PULL_UP)
+            self._sqw_callback = lgpio.callback(gpio_h, pin, lgpio.FALLING_EDGE, self._on_sqw_edge)
+            print(f"Counting RTC seconds from SQW on GPIO {pin}.")
+            return True
+        except Exception as e:
+            print(f"Could not use the RTC square wave, polling instead: {e}")
+            return False
+
+    def detach_sqw(self):
+        if self._sqw_callback is not None:
+            self._sqw_callback.cancel()
+            self._sqw_callback = None
+        with self._lock:
+            self._sqw_time = None
+
+    def _on_sqw_edge(self, chip, gpio, level, tick):
+        # The falling edge is when the RTC seconds register advances
+        mono = time.monotonic()
+        with self._lock:
+            if self._sqw_time is None or mono - self._sqw_mono > self.SQW_TIMEOUT_S:
+                self._sqw_time = get_rtc_datetime()  # first edge, or edges were missed
+            else:
+                self._sqw_time += datetime.timedelta(seconds=1)
+            self._sqw_mono = mono
+
+    def resync(self):
+        """Forget the cached reading, e.g. after the RTC has been set."""
+        with self._lock:
+            self._base = None
+            self._sqw_time = None
+
+    def now(self):
+        with self._lock:
+            mono = time.monotonic()
+            if self._sqw_time is not None and mono - self._sqw_mono <= self.SQW_TIMEOUT_S:
+                return self._sqw_time + datetime.timedelta(seconds=mono - self._sqw_mono)
+            if self._base is None or mono - self._base_mono > self.RESYNC_S:
+                self._base = get_rtc_datetime()
+                self._base_mono = time.monotonic()
+                return self._base
+            return self._base + datetime.timedelta(seconds=mono - self._base_mono)
+
+rtc_clock = RTCClock()
+
 def sync_rtc_with_ntp():
     """
     Tries to sync RTC with an NTP server.
     If NTP fails, it falls back to syncing via an HTTP header.
+    Returns True if the RTC was set.
     """
     if not RPI_MODE:
-        return
+        return False
 
     # --- 1. Try NTP (Preferred Method) ---
     try:
@@ -171,7 +331,7 @@ def sync_rtc_with_ntp():
         
         set_rtc_datetime(ntp_time_local)
         print(f"NTP sync successful. Time set to: {ntp_time_local}")
-        return
+        return True
 
     except (socket.gaierror, socket.timeout, ntplib.NTPException) as e:
         print(f"NTP sync failed: {e}")
@@ -195,43 +355,114 @@ def sync_rtc_with_ntp():
             
             set_rtc_datetime(http_time_local)
             print(f"HTTP fallback sync successful. Time set to: {http_time_local}")
-            return
+            return True
             
     except Exception as e:
         print(f"HTTP fallback sync also failed: {e}")
         print("Could not sync RTC. Using existing time.")
+    return False
+
+def sync_rtc_in_background():
+    """
+    Runs sync_rtc_with_ntp off the UI launch path and reports the result to the UI.
+    The DS3231 keeps time on its battery, so the UI can run on it until this finishes.
+    """
+    def sync_task():
+        try:
+            synced = sync_rtc_with_ntp()
+        except Exception as e:
+            print(f"RTC sync failed: {e}")
+            synced = False
+        eel.update_ui(f"RTC_SYNC,{'OK' if synced else 'FAILED'}")()
+
+    threading.Thread(target=sync_task, daemon=True).start()
 
 # --- USB Detection and Saving ---
+def _check_usb_drives(known_drives):
+    """Prompts for every newly mounted USB drive and returns the current set."""
+    # Get all mounted drives
+    partitions = psutil.disk_partitions()
+    current_drives = set()
+    
+    for partition in partitions:
+        # Check if it's a removable drive (USB)
+        if 'removable' in partition.opts or '/media' in partition.mountpoint:
+            current_drives.add(partition.mountpoint)
+    
+    # Check for newly inserted drives
+    new_drives = current_drives - known_drives
+    for drive in new_drives:
+        print(f"USB drive detected: {drive}")
+        # Notify the UI about the new drive
+        eel.show_usb_prompt(drive)()
+    
+    return current_drives
+
+def _mount_point(device_node):
+    """Returns where device_node is mounted, from /proc/self/mounts, or None."""
+    with open('/proc/self/mounts') as f:
+        for line in f:
+            fields = line.split()
+            if fields[0] == device_node:
+                # Spaces etc. in mount paths are octal-escaped, e.g. '\040'
+                return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), fields[1])
+    return None
+
+def _wait_for_mount(device_node, timeout_s=10):
+    """
+    The automounter mounts a partition shortly after udev reports it.
+    /proc/self/mounts signals POLLPRI on every mount table change, so this
+    sleeps until something is mounted instead of re-checking on a timer.
+    """
+    deadline = time.monotonic() + timeout_s
+    with open('/proc/self/mounts') as mounts:
+        poller = select.poll()
+        poller.register(mounts, select.POLLPRI)
+        while True:
+            mount_point = _mount_point(device_node)
+            if mount_point:
+                return mount_point
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            poller.poll(remaining * 1000)
+
 def monitor_usb_drives():
     """Monitor for USB drives and prompt user to save data."""
+    pin_current_thread(BACKGROUND_CORE)
     known_drives = set()
-    
-    while True:
+
+    if pyudev is None:
+        while True:
+            try:
+                known_drives = _check_usb_drives(known_drives)
+            except Exception as e:
+                print(f"Error monitoring USB drives: {e}")
+            time.sleep(2)  # Check every 2 seconds
+
+    # Block on kernel uevents instead of polling the mount table
+    monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+    monitor.filter_by('block', device_type='partition')
+    monitor.start()
+    try:
+        _check_usb_drives(known_drives)  # drives already plugged in
+    except Exception as e:
+        print(f"Error monitoring USB drives: {e}")
+
+    for device in iter(monitor.poll, None):
+        if device.action != 'add' or device.get('ID_BUS') != 'usb':
+            continue
         try:
-            # Get all mounted drives
-            partitions = psutil.disk_partitions()
-            current_drives = set()
-            
-            for partition in partitions:
-                # Check if it's a removable drive (USB)
-                if 'removable' in partition.opts or '/media' in partition.mountpoint:
-                    current_drives.add(partition.mountpoint)
-            
-            # Check for newly inserted drives
-            new_drives = current_drives - known_drives
-            for drive in new_drives:
-                print(f"USB drive detected: {drive}")
+            mount_point = _wait_for_mount(device.device_node)
+            if mount_point:
+                print(f"USB drive detected: {mount_point}")
                 # Notify the UI about the new drive
-                eel.show_usb_prompt(drive)()
-            
-            # Update known drives
-            known_drives = current_drives
-            
+                eel.show_usb_prompt(mount_point)()
+            else:
+                print(f"USB partition {device.device_node} was not mounted.")
         except Exception as e:
             print(f"Error monitoring USB drives: {e}")
         
-        time.sleep(2)  # Check every 2 seconds
-        
 def trigger_fullscreen():
     """
     Waits for the 'Spectrometer GUI' window to appear, then uses wmctrl to
@@ -269,9 +500,17 @@ def trigger_fullscreen():
 
 @eel.expose
 def copy_data_to_usb(mount_point):
-    """Copy all output data to the specified USB drive."""
+    """
+    Copy all output data to the specified USB drive in a background thread.
+    The result is reported to the UI through usb_copy_status.
+    """
+    copy_thread = threading.Thread(target=_copy_data_to_usb_task, args=(mount_point,), daemon=True)
+    copy_thread.start()
+
+def _copy_data_to_usb_task(mount_point):
+    pin_current_thread(BACKGROUND_CORE)
     try:
-        output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        output_path = _OUTPUT_DIR
         if not os.path.exists(output_path):
             eel.usb_copy_status('error', 'No output data found.')()
             return
@@ -281,7 +520,17 @@ def copy_data_to_usb(mount_point):
         dest_folder = os.path.join(mount_point, f'spectrometer_data_{timestamp}')
         
         # Copy the entire output folder
-        shutil.copytree(output_path, dest_folder)
+        if shutil.which('rsync'):
+            # rsync walks and copies in one native process with large buffers.
+            # -rt rather than -a: FAT/exFAT sticks can't keep owners or modes.
+            subprocess.run(
+                ['rsync', '-rt', '--modify-window=1', output_path + '/', dest_folder + '/'],
+                check=True
+            )
+        else:
+            # copyfile skips copy2's metadata and xattr calls and lets the
+            # kernel copy each file (sendfile) without the GIL held.
+            shutil.copytree(output_path, dest_folder, copy_function=shutil.copyfile)
         
         file_count = len(os.listdir(dest_folder))
         eel.usb_copy_status('success', f'Successfully copied {file_count} files to USB.')()
@@ -298,28 +547,8 @@ def trigger_gdrive_upload():
     """
     print("Manual Google Drive upload triggered by user...")
     
-    # Try to acquire the lock without blocking.
-    # If we can't get it, an upload is already running.
-    if gdrive_upload_lock.acquire(blocking=False):
-        print("Got lock, starting upload thread.")
-        
-        # We need a small wrapper function to run in the thread
-        # so we can release the lock when it's done.
-        def upload_task_with_lock_release():
-            try:
-                # This is the main upload function you already have
-                upload_output_to_gdrive()
-            except Exception as e:
-                print(f"Error in manual upload thread: {e}")
-            finally:
-                # IMPORTANT: Release the lock when done
-                gdrive_upload_lock.release()
-                print("Upload finished, lock released.")
-
-        # Start the upload in a new daemon thread
-        upload_thread = threading.Thread(target=upload_task_with_lock_release, daemon=True)
-        upload_thread.start()
-        
+    # Returns None if an upload is already running.
+    if start_gdrive_upload() is not None:
         return "Upload started. This may take a few minutes."
     else:
         # We couldn't get the lock
@@ -328,6 +557,48 @@ def trigger_gdrive_upload():
         
 # --- START OF NEW GOOGLE DRIVE FUNCTIONS ---
 
+def _gdrive_upload_task():
+    """Thread body for start_gdrive_upload."""
+    pin_current_thread(BACKGROUND_CORE)
+    try:
+        upload_output_to_gdrive()
+    except Exception as e:
+        print(f"Error in Google Drive upload thread: {e}")
+    print("Google Drive upload thread finished.")
+
+def start_gdrive_upload():
+    """
+    Runs upload_output_to_gdrive in a background thread. Both the manual
+    trigger and the daily scheduler start uploads through here.
+    Returns the thread, or None if an upload is already running.
+    """
+    global _gdrive_thread
+    with gdrive_upload_lock:
+        if _gdrive_thread is not None and _gdrive_thread.is_alive():
+            return None
+        _gdrive_thread = threading.Thread(target=_gdrive_upload_task, daemon=True)
+        _gdrive_thread.start()
+        return _gdrive_thread
+
+def _zip_output_folder(output_path):
+    """
+    Zips output_path into a SpooledTemporaryFile, so the archive never gets
+    written to (and read back from) the SD card. Archives up to 64 MB stay in
+    RAM; bigger ones roll over to tmpfs.
+    """
+    spool = tempfile.SpooledTemporaryFile(
+        max_size=64 << 20, dir='/dev/shm' if os.path.isdir('/dev/shm') else None
+    )
+    # compresslevel=1 is several times faster than the default and the CSVs
+    # still shrink well
+    with zipfile.ZipFile(spool, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for root, _, files in os.walk(output_path):
+            for name in files:
+                path = os.path.join(root, name)
+                zf.write(path, os.path.relpath(path, output_path))
+    spool.seek(0)
+    return spool
+
 def upload_output_to_gdrive():
     """Zips the output folder and uploads it to Google Drive (User OAuth)."""
     print("Starting daily Google Drive upload...")
@@ -339,19 +610,17 @@ def upload_output_to_gdrive():
             return
 
         # 2) Locate output and create zip
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        output_path = os.path.join(base_path, 'output')
+        base_path = _SCRIPT_DIR
+        output_path = _OUTPUT_DIR
         if not os.path.exists(output_path) or not os.listdir(output_path):
             print("Output folder not found or is empty. Nothing to upload.")
             return
 
         timestamp = get_rtc_datetime().strftime('%Y%m%d_%H%M%S')
-        zip_name = f'spectrometer_data_{timestamp}'
-        zip_path_base = os.path.join(base_path, zip_name)
+        zip_name = f'spectrometer_data_{timestamp}.zip'
 
-        print(f"Creating zip file: {zip_path_base}.zip")
-        shutil.make_archive(zip_path_base, 'zip', output_path)
-        zip_file_path = zip_path_base + '.zip'
+        print(f"Creating zip file: {zip_name}")
+        zip_file = _zip_output_folder(output_path)
 
         # 3) Authenticate with Google Drive (USER OAUTH)  ⬇️ REPLACEMENT STARTS HERE
         print("Authenticating with Google Drive (user OAuth)...")
@@ -390,51 +659,33 @@ def upload_output_to_gdrive():
         drive = GoogleDrive(gauth)
         # ----------------------------- REPLACEMENT ENDS HERE -----------------------------
        
-        # 4) Upload the zip (and release file handle so Windows can delete it)
-        print(f"Uploading {zip_file_path} to Google Drive (resumable)...")
+        # 4) Upload the zip straight from the spooled file
+        print(f"Uploading {zip_name} to Google Drive (resumable)...")
         f = drive.CreateFile({
-            'title': os.path.basename(zip_file_path),
+            'title': zip_name,
+            'mimeType': 'application/zip',
             'parents': [{'id': parent_folder_id}]
         })
+        f.content = zip_file
         
-        try:
-            # This opens the file handle
-            f.SetContentFile(zip_file_path)
-            
-            # THIS IS THE FIX: 'uploadType': 'resumable'
-            f.Upload(param={'uploadType': 'resumable'})
-            
-            print(f"Successfully uploaded {zip_file_path}.")
-
-        finally:
-            # This 'finally' block GUARANTEES the file handle is closed,
-            # even if the f.Upload() line fails. This prevents WinError 32.
-            if hasattr(f, 'content') and f.content:
-                try:
-                    f.content.close()
-                    print("File handle closed.")
-                except Exception as e:
-                    print(f"Warning: Error closing file handle: {e}")
-
-        # 5) Clean up local zip file
-        # This will now work because the 'finally' block ran and closed the file.
-        os.remove(zip_file_path)
-        print(f"Cleaned up local file: {zip_file_path}")
+        # THIS IS THE FIX: 'uploadType': 'resumable'
+        f.Upload(param={'uploadType': 'resumable'})
+        
+        print(f"Successfully uploaded {zip_name}.")
 
     except Exception as e:
         print(f"Google Drive upload failed: {e}")
-        if 'zip_file_path' in locals() and os.path.exists(zip_file_path):
-            try:
-                os.remove(zip_file_path)
-                print(f"Cleaned up partial zip file: {zip_file_path}")
-            except Exception as e_clean:
-                print(f"Error cleaning up zip file: {e_clean}")
+    finally:
+        # Closing the spooled file frees its memory / tmpfs space
+        if 'zip_file' in locals():
+            zip_file.close()
 
 
 def gdrive_upload_scheduler():
     """
     Runs in a background thread, triggering an upload at a specific time each day.
     """
+    pin_current_thread(BACKGROUND_CORE)
     # Set this to the time you want the upload to happen (24-hour format)
     UPLOAD_HOUR = 3  # 3:00 AM
     UPLOAD_MINUTE = 0
@@ -464,7 +715,9 @@ def gdrive_upload_scheduler():
             time.sleep(sleep_duration)
             
             # --- It's time to upload! ---
-            upload_output_to_gdrive()
+            upload_thread = start_gdrive_upload()
+            if upload_thread is not None:
+                upload_thread.join()
             
             # Sleep for 60 seconds to ensure we don't re-run in the same minute
             time.sleep(60) 
@@ -492,14 +745,17 @@ class RPIController:
             try:
                 # Initialize GPIO for Relay and Boost using lgpio
                 self.gpio_h = lgpio.gpiochip_open(0)
-                lgpio.gpio_claim_output(self.gpio_h, RELAY_PIN)
-                lgpio.gpio_claim_output(self.gpio_h, BOOST_PIN)
+                # Claimed as one group (BOOST_PIN leads) so a spark can switch
+                # both pins with a single write
+                lgpio.group_claim_output(self.gpio_h, [BOOST_PIN, RELAY_PIN], [0, 0])
                 self.set_relay(False)
                 self.set_boost(False)
                 print("GPIO pins initialized.")
+                if RTC_SQW_PIN is not None:
+                    rtc_clock.attach_sqw(self.gpio_h, RTC_SQW_PIN)
 
                 # Initialize I2C and DAC using Adafruit libraries
-                self.i2c = busio.I2C(board.SCL, board.SDA)
+                self.i2c = get_i2c()
                 self.dac = adafruit_mcp4725.MCP4725(self.i2c, address=MCP4725_ADDRESS)
                 print(f"MCP4725 DAC initialized successfully at address {hex(MCP4725_ADDRESS)}")
                 self.set_pump(False)  # Set initial state to OFF
@@ -533,9 +789,16 @@ class RPIController:
             lgpio.gpio_write(self.gpio_h, BOOST_PIN, 1 if state else 0)
         print(f"Boost set to {'ON' if state else 'OFF'}")
 
+    def set_spark(self, state):
+        """Switches boost and relay together in one group write, so their edges line up."""
+        if RPI_MODE and self.gpio_h:
+            lgpio.group_write(self.gpio_h, BOOST_PIN, 0b11 if state else 0b00, 0b11)
+        print(f"Boost and relay set to {'ON' if state else 'OFF'}")
+
     def cleanup(self):
         if RPI_MODE:
             self.set_pump(False)  # Ensure pump is off
+            rtc_clock.detach_sqw()
             if self.gpio_h:
                 try:
                     lgpio.gpio_write(self.gpio_h, RELAY_PIN, 0)
@@ -543,16 +806,16 @@ class RPIController:
                     lgpio.gpiochip_close(self.gpio_h)
                 except Exception as e: 
                     print(f"Error closing GPIO: {e}")
+            close_rtc()
             # Note: Adafruit libraries handle I2C cleanup automatically
         print("Hardware cleanup complete.")
 
     def _execute_spark_sequence(self):
         """Executes one 4-second ON spark sequence."""
-        self.set_boost(True)
-        self.set_relay(True)
-        time.sleep(4)
-        self.set_relay(False)
-        self.set_boost(False)
+        self.set_spark(True)
+        # An abort cuts the spark short; callers check the event afterwards
+        self.stop_operation.wait(4)
+        self.set_spark(False)
 
     def run_scan_sequence(self, duration_min, sparks, cycles):
         """Runs the scan sequence."""
@@ -568,15 +831,22 @@ class RPIController:
             
             # Pump stage
             self.set_pump(True)
-            start_time = time.time()
+            deadline = time.monotonic() + total_time_ms / 1000
             
-            while (time.time() - start_time) * 1000 < total_time_ms:
-                if self.stop_operation.is_set():
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # The UI counts down locally, so it only needs a resync on
+                # every 10-second mark instead of a message per second
+                eel.update_ui(f'TIME_LEFT,{int(remaining * 1000)}')()
+                next_mark = remaining % 10.0
+                if next_mark < 0.5:
+                    next_mark += 10.0  # just sent; skip to the following mark
+                # Returns as soon as an abort is requested
+                if self.stop_operation.wait(min(remaining, next_mark)):
                     self.set_pump(False)
                     return
-                time_left = total_time_ms - (time.time() - start_time) * 1000
-                eel.update_ui(f'TIME_LEFT,{int(time_left)}')()
-                time.sleep(1)
             
             self.set_pump(False)
             
@@ -587,7 +857,7 @@ class RPIController:
                 eel.update_ui(f'SPARK,{spark}')()
                 self._execute_spark_sequence()
                 if spark < sparks:
-                    time.sleep(2)
+                    self.stop_operation.wait(2)
         
         eel.update_ui('DONE')()
 
@@ -604,7 +874,7 @@ class RPIController:
             eel.update_ui(f'SPARK,{spark}')()
             self._execute_spark_sequence()
             if spark < sparks:
-                time.sleep(2)
+                self.stop_operation.wait(2)
         
         eel.update_ui('DONE')()
 
@@ -616,10 +886,14 @@ class RPIController:
         # Simulated PM sensor reading
         base_value = 500
         noise_range = 100
+        # Noise drawn in one batch; the loop just steps through it
+        noise = np.random.default_rng().integers(-noise_range, noise_range, size=65536).tolist()
+        reading = 0
         
         while not self.stop_operation.is_set():
             # Simulate sensor reading
-            current_value = base_value + np.random.randint(-noise_range, noise_range)
+            current_value = base_value + noise[reading & 0xFFFF]
+            reading += 1
             eel.update_ui(f'PM_VALUE,{current_value}')()
             
             if current_value >= threshold:
@@ -632,14 +906,26 @@ class RPIController:
                     eel.update_ui(f'SPARK,{spark}')()
                     self._execute_spark_sequence()
                     if spark < sparks:
-                        time.sleep(2)
+                        self.stop_operation.wait(2)
                 
                 eel.update_ui('PM SPARKS COMPLETE')()
                 # Reset base value after sparking
                 base_value = 300
             
-            time.sleep(1)
+            self.stop_operation.wait(1.0)
 	
+    def _wait_until_rtc(self, target):
+        """
+        Blocks until the RTC reaches target. Returns True if aborted first.
+        The time is re-checked at least once a minute in case the clock is adjusted.
+        """
+        while True:
+            remaining = (target - rtc_clock.now()).total_seconds()
+            if remaining <= 0:
+                return False
+            if self.stop_operation.wait(min(60.0, remaining)):
+                return True
+
     def run_hourly_monitoring_sequence(self):
         """
         Starts an hourly cycle.
@@ -654,7 +940,7 @@ class RPIController:
         while not self.stop_operation.is_set():
             try:
                 # --- 1. DEFINE TIME WINDOWS FOR THE CURRENT HOUR ---
-                current_time = get_rtc_datetime()
+                current_time = rtc_clock.now()
                 current_hour_start = current_time.replace(minute=0, second=0, microsecond=0)
                 spark_start_time = current_hour_start.replace(minute=55)
                 next_hour_start = current_hour_start + datetime.timedelta(hours=1)
@@ -678,7 +964,7 @@ class RPIController:
                         print(f"HOURLY_MIDNIGHT: Spark {s}/{sparks}")
                         self._execute_spark_sequence()
                         if s < sparks:
-                            time.sleep(2)
+                            self.stop_operation.wait(2)
                     
                     print("HOURLY: Midnight cleaning complete.")
                     self.midnight_clean_done_today = True # Mark as done for today
@@ -690,11 +976,9 @@ class RPIController:
                     eel.update_ui(f"HOURLY_MONITOR_STATUS,Waiting for next hour,")()
                     eel.update_ui(f"HOURLY_NEXT_EVENT,{next_hour_start.isoformat()}")()
 
-                    while get_rtc_datetime() < next_hour_start:
-                        if self.stop_operation.is_set():
-                            print("Hourly Monitoring aborted during waiting stage.")
-                            return
-                        time.sleep(1)
+                    if self._wait_until_rtc(next_hour_start):
+                        print("Hourly Monitoring aborted during waiting stage.")
+                        return
                     
                     # Skip the rest of this loop iteration and start fresh at the new hour.
                     continue
@@ -704,12 +988,10 @@ class RPIController:
                 self.set_pump(True)
                 eel.update_ui(f"HOURLY_MONITOR_STATUS,Pumping until {spark_start_time.strftime('%H:%M')},")()
 
-                while get_rtc_datetime() < spark_start_time:
-                    if self.stop_operation.is_set():
-                        self.set_pump(False)
-                        print("Hourly Monitoring aborted during pumping.")
-                        return
-                    time.sleep(1)
+                if self._wait_until_rtc(spark_start_time):
+                    self.set_pump(False)
+                    print("Hourly Monitoring aborted during pumping.")
+                    return
                 
                 self.set_pump(False)
                 print("HOURLY: Pumping complete for this cycle.")
@@ -725,7 +1007,7 @@ class RPIController:
                         return
                     self._execute_spark_sequence()
                     if s < sparks:
-                        time.sleep(2)
+                        self.stop_operation.wait(2)
                 print("HOURLY: Sparking complete.")
 
                 # --- 7. WAITING STAGE (For cycles that have finished pumping/sparking) ---
@@ -733,32 +1015,31 @@ class RPIController:
                 eel.update_ui(f"HOURLY_MONITOR_STATUS,Waiting for next hour,")()
                 eel.update_ui(f"HOURLY_NEXT_EVENT,{next_hour_start.isoformat()}")()
 
-                while get_rtc_datetime() < next_hour_start:
-                    if self.stop_operation.is_set():
-                        print("Hourly Monitoring aborted during final waiting stage.")
-                        return
-                    time.sleep(1)
+                if self._wait_until_rtc(next_hour_start):
+                    print("Hourly Monitoring aborted during final waiting stage.")
+                    return
 
             except Exception as e:
                 print(f"An error occurred in hourly monitor: {e}. Retrying in 5 mins.")
-                # We use a blocking sleep here, but check for stop operation
-                # in a loop to remain responsive to stop commands.
-                wait_start = time.time()
-                while (time.time() - wait_start) < 300: # 300 seconds = 5 minutes
-                    if self.stop_operation.is_set():
-                        print("Hourly Monitoring aborted during error-wait.")
-                        return
-                    time.sleep(1)
+                # Waiting on the stop event keeps this responsive to stop commands.
+                if self.stop_operation.wait(300): # 300 seconds = 5 minutes
+                    print("Hourly Monitoring aborted during error-wait.")
+                    return
 
 
     def start_operation(self, target, *args):
         if self.operation_thread and self.operation_thread.is_alive(): return False
         self.stop_operation.clear()
-        self.operation_thread = threading.Thread(target=target, args=args)
+        self.operation_thread = threading.Thread(target=self._run_operation, args=(target,) + args)
         self.operation_thread.daemon = True
         self.operation_thread.start()
         return True
 
+    def _run_operation(self, target, *args):
+        # The spark timing runs on its own core, at a raised priority where allowed
+        pin_current_thread(OPERATION_CORE, nice=-5)
+        target(*args)
+
     def abort_operation(self):
         if self.operation_thread and self.operation_thread.is_alive():
             self.stop_operation.set()
@@ -768,17 +1049,39 @@ class RPIController:
 def get_rtc_time_str():
     return get_rtc_datetime().strftime("%Y-%m-%d %H:%M:%S")
 
+def _orjson_safe_json(obj):
+    """ eel's _safe_json with orjson: C-speed encoding, and numpy arrays are encoded natively. """
+    try:
+        return orjson.dumps(obj, default=lambda o: None, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    except orjson.JSONEncodeError:
+        # e.g. non-string dict keys, which json converts and orjson rejects
+        return json.dumps(obj, default=lambda o: None)
+
+if orjson is not None:
+    # eel looks _safe_json up at call time for every message to the browser
+    eel._safe_json = _orjson_safe_json
+
 # Cleaned up initialization
 eel.init('web')
 rpi_controller = RPIController()
 
-# Start the spectrometer process
-spectrometer_process = start_spectrometer_process()
+# Start the spectrometer acquisition
+spectrometer_thread = start_spectrometer_thread()
 
 @eel.expose
 def close_app():
     sys.exit(0)
 
+def _on_shutdown_signal(signum, frame):
+    """
+    SIGTERM/SIGHUP (systemctl stop, closed session): signal the workers to stop
+    at once, then unwind through the cleanup in __main__'s finally block.
+    """
+    print(f"Received {signal.Signals(signum).name}, shutting down.")
+    rpi_controller.stop_operation.set()
+    spectrometer_stop.set()
+    sys.exit(0)
+
 @eel.expose
 def get_config(): return config
 @eel.expose
@@ -796,25 +1099,175 @@ def abort_all():
 @eel.expose
 def is_rpi_ready(): return RPI_MODE and rpi_controller.is_hw_ready
 
+# Last list_scans result, with the mtime of every directory it covered.
+# Adding or removing a scan changes its directory's mtime, so while none of
+# them have changed the cached listing is still valid.
+_scan_cache = {'dirs': [], 'mtimes': None, 'files': [], 'file_mtimes': []}
+
+def _dir_mtimes(dirs):
+    try:
+        return [os.stat(d).st_mtime_ns for d in dirs]
+    except FileNotFoundError:
+        return None
+
 @eel.expose
-def list_scans():
+def list_scans(limit=None, include_previews=False, max_points=256):
     """
-    Recursively finds all .csv files in the output directory, sorts them by
+    Recursively finds all .txt scans in the output directory, sorts them by
     modification time (newest first), and returns them as paths relative
-    to the 'output' directory (e.g., '1025/scan_01.csv').
+    to the 'output' directory (e.g., '1025/2025-10-01T12-00-00.txt').
+    If limit is given, only the newest limit scans are returned.
+    With include_previews, each scan is returned as {'path', 'mtime', 'preview'},
+    where preview is the intensity column cut down to about max_points
+    values, so a gallery needs no get_scan_data call per file.
     """
-    output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+    global _scan_cache
+    output_path = _OUTPUT_DIR
     if not os.path.exists(output_path): os.makedirs(output_path)
-    
-    # Recursively find all .csv files using glob
-    files = sorted(
-        glob.glob(os.path.join(output_path, '**', '*.txt'), recursive=True),
-        key=os.path.getmtime,
-        reverse=True
-    )
-    
+
+    cache = _scan_cache
+    if cache['mtimes'] is None or _dir_mtimes(cache['dirs']) != cache['mtimes']:
+        cache = _scan_cache = _walk_scans(output_path)
+
+    files = cache['files'][:limit]
+    if not include_previews:
+        return files
+    scans = []
+    for filename, mtime_ns in zip(files, cache['file_mtimes']):
+        try:
+            preview = _load_scan_preview(os.path.join(output_path, filename), mtime_ns, max_points)
+        except Exception as e:
+            print(f"Error reading file {filename}: {e}")
+            preview = []
+        scans.append({'path': filename, 'mtime': mtime_ns / 1e9, 'preview': preview})
+    return scans
+
+def _walk_scans(output_path):
+    """ Lists the scans under output_path, newest first, in the _scan_cache layout. """
+    # Walk the tree with scandir; DirEntry already knows file vs directory,
+    # so only the scans themselves get stat'ed for their mtime
+    dirs, mtimes, entries = [], [], []
+    pending = [output_path]
+    while pending:
+        path = pending.pop()
+        dirs.append(path)
+        mtimes.append(os.stat(path).st_mtime_ns)  # before listing, so nothing added later is missed
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    pending.append(entry.path)
+                elif entry.name.endswith('.txt') and entry.is_file():
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+    entries.sort(reverse=True)
+
     # Return paths relative to the 'output' directory
-    return [os.path.relpath(f, output_path) for f in files]
+    files = [os.path.relpath(f, output_path) for _, f in entries]
+    file_mtimes = [m for m, _ in entries]
+    return {'dirs': dirs, 'mtimes': mtimes, 'files': files, 'file_mtimes': file_mtimes}
+
+# --- Peak detection for saved scans ---
+PEAK_HEIGHT = 6500
+PEAK_DISTANCE = 50
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _local_maxima(y, min_height):
+        """Local maxima (middle of flat tops) at or above min_height, as scipy finds them."""
+        peaks = np.empty(y.shape[0] // 2, dtype=np.int64)
+        n = 0
+        i = 1
+        i_max = y.shape[0] - 1
+        while i < i_max:
+            if y[i - 1] < y[i]:
+                i_ahead = i + 1
+                while i_ahead < i_max and y[i_ahead] == y[i]:
+                    i_ahead += 1
+                if y[i_ahead] < y[i]:
+                    if y[i] >= min_height:
+                        peaks[n] = (i + i_ahead - 1) // 2
+                        n += 1
+                    i = i_ahead
+            i += 1
+        return peaks[:n]
+
+    @njit(cache=True)
+    def _select_by_distance(peaks, order, distance):
+        """Keeps the highest peaks first, dropping neighbours closer than distance."""
+        keep = np.ones(peaks.shape[0], dtype=np.bool_)
+        for i in range(peaks.shape[0] - 1, -1, -1):
+            j = order[i]
+            if not keep[j]:
+                continue
+            k = j - 1
+            while k >= 0 and peaks[j] - peaks[k] < distance:
+                keep[k] = False
+                k -= 1
+            k = j + 1
+            while k < peaks.shape[0] and peaks[k] - peaks[j] < distance:
+                keep[k] = False
+                k += 1
+        return peaks[keep]
+
+def find_scan_peaks(y):
+    """ Same result as find_peaks(y, height=PEAK_HEIGHT, distance=PEAK_DISTANCE)[0]. """
+    if not NUMBA_AVAILABLE:
+        peaks, _ = find_peaks(y, height=PEAK_HEIGHT, distance=PEAK_DISTANCE)
+        return peaks
+    y = np.asarray(y, dtype=np.float64)
+    peaks = _local_maxima(y, PEAK_HEIGHT)
+    # Ties are ordered by numpy's argsort, exactly as scipy does
+    order = np.argsort(y[peaks])
+    return _select_by_distance(peaks, order, PEAK_DISTANCE)
+
+if NUMBA_AVAILABLE:
+    find_scan_peaks(np.zeros(3))  # compile (or load from cache) now, not on the first click
+
+def _scan_reply(x, y, peaks):
+    """
+    Scan data as a JSON string. The arrays go as base64 little-endian binary,
+    the wavelengths as float32 and the counts as uint16, which the browser
+    views as typed arrays instead of parsing thousands of float strings.
+    """
+    reply = {'x_b64': base64.b64encode(x.astype('<f4').tobytes()).decode('ascii')}
+    y16 = y.astype('<u2')
+    if np.array_equal(y16, y):
+        reply['y_b64'] = base64.b64encode(y16.tobytes()).decode('ascii')
+    else:
+        reply['y'] = y.tolist()  # not whole counts in the uint16 range
+    reply['peaks'] = peaks.tolist()
+    if orjson is not None:
+        return orjson.dumps(reply).decode()
+    return json.dumps(reply)
+
+def _read_scan(full_path):
+    """ Returns the wavelength and intensity columns of a scan file. """
+    # The first line is skipped, as pd.read_csv did by taking it as the header
+    data = np.loadtxt(full_path, delimiter=',', skiprows=1, usecols=(0, 1), ndmin=2)
+    return data[:, 0], data[:, 1]
+
+@functools.lru_cache(maxsize=64)
+def _load_scan_reply(full_path, mtime_ns):
+    """
+    Parses a scan file into its JSON reply. mtime_ns is part of the cache key,
+    so a file that changes on disk is parsed again.
+    """
+    x, y = _read_scan(full_path)
+    return _scan_reply(x, y, find_scan_peaks(y))
+
+@functools.lru_cache(maxsize=1024)
+def _load_scan_peaks(full_path, mtime_ns):
+    """ Peak indices of a scan file, cached like _load_scan_reply. """
+    _, y = _read_scan(full_path)
+    return find_scan_peaks(y).tolist()
+
+@functools.lru_cache(maxsize=1024)
+def _load_scan_preview(full_path, mtime_ns, max_points):
+    """ Every n-th intensity of a scan file, about max_points values, cached like _load_scan_reply. """
+    _, y = _read_scan(full_path)
+    stride = max(1, len(y) // max_points)
+    return y[::stride].astype(np.float32).tolist()
 
 @eel.expose
 def get_scan_data(filename):
@@ -823,28 +1276,47 @@ def get_scan_data(filename):
     'filename' is a relative path like '1025/scan_01.csv'.
     """
     # Reconstruct the full path
-    full_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', filename)
+    full_path = os.path.join(_OUTPUT_DIR, filename)
     
-    if not os.path.exists(full_path): 
+    try:
+        mtime_ns = os.stat(full_path).st_mtime_ns
+    except FileNotFoundError:
         print(f"Error: File not found at {full_path}")
-        return {'x': [], 'y': [], 'peaks': []}
+        return json.dumps({'x': [], 'y': [], 'peaks': []})
         
     try:
-        df = pd.read_csv(full_path)
-        x, y = df.iloc[:,0].tolist(), df.iloc[:,1].tolist()
-        peaks, _ = find_peaks(y, height=6500, distance=50)
-        return {'x': x, 'y': y, 'peaks': peaks.tolist()}
+        return _load_scan_reply(full_path, mtime_ns)
     except Exception as e:
         print(f"Error reading file {full_path}: {e}")
-        return {'x': [], 'y': [], 'peaks': []}
+        return json.dumps({'x': [], 'y': [], 'peaks': []})
+
+@eel.expose
+def get_all_peaks():
+    """
+    Peak indices for every scan in list_scans(), as {relative path: [indices]},
+    so the UI can show all of them with one call instead of one per file.
+    """
+    all_peaks = {}
+    for filename in list_scans():
+        full_path = os.path.join(_OUTPUT_DIR, filename)
+        try:
+            all_peaks[filename] = _load_scan_peaks(full_path, os.stat(full_path).st_mtime_ns)
+        except Exception as e:
+            print(f"Error reading file {full_path}: {e}")
+            all_peaks[filename] = []
+    return all_peaks
 
 # Removed the get_scan_data_avg function as requested
 
 if __name__ == '__main__':
-    # Attempt to sync RTC with internet time at startup
-    #sync_rtc_with_ntp()
-    
+    signal.signal(signal.SIGTERM, _on_shutdown_signal)
+    if hasattr(signal, 'SIGHUP'):  # not on Windows
+        signal.signal(signal.SIGHUP, _on_shutdown_signal)
+
     try:
+        # Attempt to sync RTC with internet time without delaying the UI
+        sync_rtc_in_background()
+
         usb_thread = threading.Thread(target=monitor_usb_drives, daemon=True)
         usb_thread.start()
 
@@ -889,12 +1361,9 @@ if __name__ == '__main__':
         rpi_controller.abort_operation()
         rpi_controller.cleanup()
         
-        # Terminate spectrometer process if it exists
-        if spectrometer_process:
-            try:
-                spectrometer_process.terminate()
-                spectrometer_process.wait(timeout=5)
-            except:
-                spectrometer_process.kill()
+        # Stop the spectrometer acquisition if it is running
+        if spectrometer_thread:
+            spectrometer_stop.set()
+            spectrometer_thread.join(timeout=5)
         
         print("Application has been shut down.")
@@ -1,41 +1,90 @@
 import time
-import board
-import busio
-import adafruit_mcp4725
+import smbus2
+from i2c_shared import check_i2c_speed
 
 # --- I2C Configuration ---
 # This address should match your hardware and the other scripts.
-I2C_BUS = 1 # This is handled by the 'board' library, but kept for reference
+I2C_BUS = 1
 MCP4725_ADDRESS = 0x60 # Default I2C address for the MCP4725
 
 # The MCP4725 is a 12-bit DAC, so the raw value ranges from 0 to 4095.
 MAX_DAC_VALUE = 4095
 MIN_DAC_VALUE = 0
 
+def set_dac_value(dac, value):
+    """
+    Sets the DAC output with an MCP4725 Fast Mode write: the command byte
+    carries the upper 4 bits and one data byte the lower 8.
+    """
+    dac.write_byte_data(MCP4725_ADDRESS, (value >> 8) & 0x0F, value & 0xFF)
+
 def setup_dac():
-    """Initializes the I2C bus and connects to the DAC using Adafruit libraries."""
+    """
+    Opens the I2C bus and checks that the DAC answers. Returns the SMBus
+    handle to pass to set_dac_value.
+
+    For faster I2C transfers, set the bus to 400 kHz in /boot/firmware/config.txt
+    (/boot/config.txt on older images) and reboot:
+        dtparam=i2c_arm_baudrate=400000
+    """
+    check_i2c_speed(I2C_BUS)
     try:
         print("Initializing I2C bus...")
-        # The 'board' library automatically finds the correct I2C pins (SCL, SDA)
-        i2c = busio.I2C(board.SCL, board.SDA)
+        bus = smbus2.SMBus(I2C_BUS)
         print("I2C bus initialized.")
+    except Exception as e:
+        print(f"An unexpected error occurred during setup: {e}")
+        return None
 
+    try:
         print(f"Attempting to connect to DAC at address {hex(MCP4725_ADDRESS)}...")
-        # Create a DAC instance using the Adafruit library.
-        dac = adafruit_mcp4725.MCP4725(i2c, address=MCP4725_ADDRESS)
+        # A write the DAC doesn't acknowledge raises OSError; this one also
+        # sets the pump to OFF
+        set_dac_value(bus, MIN_DAC_VALUE)
         print("SUCCESS: Successfully connected to MCP4725 DAC.")
-        return dac
+        return bus
         
-    except ValueError:
+    except OSError:
+        bus.close()
         print("-" * 50)
         print(f"FATAL ERROR: Could not find a device at I2C address {hex(MCP4725_ADDRESS)}.")
         print("Please double-check your wiring and the I2C address.")
         print("You can use 'sudo i2cdetect -y 1' in the terminal to scan for devices.")
         print("-" * 50)
         return None
-    except Exception as e:
-        print(f"An unexpected error occurred during setup: {e}")
-        return None
+
+def prompt_commands(prompt):
+    """
+    Yields lines typed at the terminal until EOF. input() blocks until a line
+    arrives, so waiting for the user costs no CPU.
+    """
+    while True:
+        try:
+            yield input(prompt)
+        except EOFError:
+            return
+
+def run_commands(dac, commands):
+    """
+    Applies 'on'/'off' commands to the DAC until 'quit'. commands can be any
+    blocking iterable of lines, e.g. iter(sys.stdin.readline, '') for a pipe;
+    never a loop polling a non-blocking source.
+    """
+    for command in commands:
+        command = command.strip().lower()
+        if command == "on":
+            print(f"--> Sending ON command (raw value: {MAX_DAC_VALUE})")
+            set_dac_value(dac, MAX_DAC_VALUE)
+            print("Pump should be ON.")
+        elif command == "off":
+            print(f"--> Sending OFF command (raw value: {MIN_DAC_VALUE})")
+            set_dac_value(dac, MIN_DAC_VALUE)
+            print("Pump should be OFF.")
+        elif command == "quit":
+            print("Exiting test utility.")
+            break
+        else:
+            print("Invalid command. Please try again.")
 
 def main():
     """
@@ -48,29 +97,13 @@ def main():
         print("Exiting due to setup failure.")
         return
 
-    # Ensure the pump is off at the start
-    print("Setting initial pump state to OFF.")
-    dac.raw_value = MIN_DAC_VALUE
+    # setup_dac has already set the pump to OFF
+    print("Initial pump state is OFF.")
 
-    print("\n--- Pump Test Utility (Adafruit Library Version) ---")
+    print("\n--- Pump Test Utility (smbus2 Version) ---")
     try:
-        # 2. Enter a loop to get user commands
-        while True:
-            command = input("Enter 'on', 'off', or 'quit': ").lower()
-            
-            if command == "on":
-                print(f"--> Sending ON command (raw value: {MAX_DAC_VALUE})")
-                dac.raw_value = MAX_DAC_VALUE
-                print("Pump should be ON.")
-            elif command == "off":
-                print(f"--> Sending OFF command (raw value: {MIN_DAC_VALUE})")
-                dac.raw_value = MIN_DAC_VALUE
-                print("Pump should be OFF.")
-            elif command == "quit":
-                print("Exiting test utility.")
-                break
-            else:
-                print("Invalid command. Please try again.")
+        # 2. Run user commands as they are typed
+        run_commands(dac, prompt_commands("Enter 'on', 'off', or 'quit': "))
 
     except KeyboardInterrupt:
         print("\nCtrl+C detected. Shutting down.")
@@ -80,7 +113,8 @@ def main():
         # 3. Clean up resources
         if dac:
             print("Cleaning up: Turning pump off.")
-            dac.raw_value = MIN_DAC_VALUE
+            set_dac_value(dac, MIN_DAC_VALUE)
+            dac.close()
         print("Script finished.")
 
 if __name__ == "__main__":
@@ -1,45 +1,60 @@
 import time
 import sys
+from i2c_shared import get_i2c, check_i2c_speed
 
-try:
-    # --- RPi specific imports ---
-    import board
-    import busio
-    import adafruit_mcp4725
-    RPI_MODE = True
-    print("Hardware libraries loaded successfully.")
-except ImportError:
-    print("\n--- ERROR ---")
-    print("This script requires the 'adafruit-circuitpython-mcp4725' library.")
-    print("Please run this script on your Raspberry Pi after installing the library:")
-    print("pip install adafruit-circuitpython-mcp4725")
-    RPI_MODE = False
-    sys.exit(1)
-except RuntimeError:
-    print("\n--- ERROR ---")
-    print("Could not initialize hardware. Are you running this on a Raspberry Pi?")
-    RPI_MODE = False
-    sys.exit(1)
+# The DAC driver, imported on first use by _load_driver() so that importing
+# this module doesn't pull in Blinka and its board detection.
+adafruit_mcp4725 = None
+
+def _load_driver():
+    """Imports the MCP4725 driver once and returns whether it is available."""
+    global adafruit_mcp4725
+    if adafruit_mcp4725 is None:
+        try:
+            import adafruit_mcp4725 as driver
+        except ImportError:
+            print("\n--- ERROR ---")
+            print("This script requires the 'adafruit-circuitpython-mcp4725' library.")
+            print("Please run this script on your Raspberry Pi after installing the library:")
+            print("pip install adafruit-circuitpython-mcp4725")
+            return False
+        adafruit_mcp4725 = driver
+    return True
 
 
 # --- Configuration (from your Main.py) ---
 # The default I2C address for the MCP4725
 MCP4725_ADDRESS = 0x60 
 
+def read_eeprom(i2c):
+    """
+    Returns (value, power_down_bits) stored in the DAC's EEPROM, from the
+    MCP4725's 5-byte read (status, DAC register x2, EEPROM x2).
+    """
+    buf = bytearray(5)
+    while not i2c.try_lock():
+        pass
+    try:
+        i2c.readfrom_into(MCP4725_ADDRESS, buf)
+    finally:
+        i2c.unlock()
+    return ((buf[3] & 0x0F) << 8) | buf[4], (buf[3] >> 5) & 0x03
+
 def set_dac_default_to_zero():
     """
     Connects to the MCP4725 DAC and permanently sets its 
     power-on default value (EEPROM) to 0.
     """
-    if not RPI_MODE:
-        return # Should have already exited, but for safety.
+    if not _load_driver():
+        return False
 
     print("\n--- DAC EEPROM Update Utility ---")
     print(f"Attempting to connect to MCP4725 DAC at address {hex(MCP4725_ADDRESS)}...")
 
     try:
         # Initialize I2C and DAC
-        i2c = busio.I2C(board.SCL, board.SDA)
+        check_i2c_speed()
+        i2c = get_i2c()
         dac = adafruit_mcp4725.MCP4725(i2c, address=MCP4725_ADDRESS)
         
         print("Successfully connected to DAC.")
@@ -47,6 +62,13 @@ def set_dac_default_to_zero():
         # Check current value
         current_volatile_value = dac.raw_value
         print(f"Current VOLATILE (temporary) value: {current_volatile_value} (out of 4095)")
+        eeprom_value, power_down = read_eeprom(i2c)
+        print(f"Current EEPROM (power-on default) value: {eeprom_value} (out of 4095)")
+
+        # EEPROM cells wear out, so don't rewrite one that already holds 0
+        if eeprom_value == 0 and power_down == 0:
+            print("\nThe power-on default is already 0. No changes were made.")
+            return
 
         print("\n!!! WARNING !!!")
         print("This script will permanently set the DAC's POWER-ON DEFAULT value to 0.")
@@ -71,12 +93,17 @@ def set_dac_default_to_zero():
         dac.save_to_eeprom()
         
         # The MCP4725 takes a moment (up to 50ms) to write to EEPROM
-        time.sleep(0.1) # Wait 100ms to be safe
+        time.sleep(0.1) # Wait 100ms to be safe, only needed after a write
         
         print("\n--- SUCCESS ---")
         print("The DAC's power-on default value has been permanently set to 0.")
         print("You can now power-cycle your device, and it will start at 0V.")
 
+    except RuntimeError:
+        # board refuses to load off the Pi
+        print("\n--- ERROR ---")
+        print("Could not initialize hardware. Are you running this on a Raspberry Pi?")
+        return False
     except (ValueError, OSError) as e:
         print("\n--- FAILED ---")
         print(f"Error: Could not communicate with DAC at address {hex(MCP4725_ADDRESS)}.")
@@ -86,4 +113,5 @@ def set_dac_default_to_zero():
         print(f"\nAn unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    set_dac_default_to_zero()
+    if set_dac_default_to_zero() is False:
+        sys.exit(1)
@@ -6,29 +6,78 @@
 #  - Manual: sudo python3 set_time.py --manual "YYYY-MM-DD HH:MM:SS"
 
 import smbus2
+import atexit
 import datetime
-import time
 import requests
 import argparse
+import re
+from zoneinfo import ZoneInfo
+try:
+    import ntplib
+except ImportError:
+    ntplib = None
 
 # I2C Configuration (must match main.py)
 I2C_BUS = 1
 DS3231_ADDRESS = 0x68
 
+# The RTC keeps Pacific wall-clock time
+TIMEZONE = ZoneInfo("America/Los_Angeles")
+NTP_SERVER = "pool.ntp.org"
+
+# Opened on first use and shared by the set and the read-back
+_BUS = None
+
+def _get_bus():
+    """Returns the I2C bus, opening it on first use."""
+    global _BUS
+    if _BUS is None:
+        _BUS = smbus2.SMBus(I2C_BUS)
+    return _BUS
+
+atexit.register(lambda: _BUS and _BUS.close())
+
 # --- Time fetching ---
+# One pooled keep-alive connection, reused if the time is fetched again
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+def get_ntp_time():
+    """Fetches the current Pacific time with a single NTP query, or None."""
+    if ntplib is None:
+        return None
+    try:
+        response = ntplib.NTPClient().request(NTP_SERVER, version=3, timeout=5)
+        utc_time = datetime.datetime.fromtimestamp(response.tx_time, datetime.timezone.utc)
+        # Naive wall-clock time, like the World Time API fallback returns
+        dt_object = utc_time.astimezone(TIMEZONE).replace(tzinfo=None, microsecond=0)
+        print(f"Successfully fetched NTP time: {dt_object}")
+        return dt_object
+    except Exception as e:
+        print(f"NTP query to {NTP_SERVER} failed, trying the World Time API. {e}")
+        return None
+
+# The one field used from the World Time API reply
+_DATETIME_FIELD = re.compile(r'"datetime"\s*:\s*"([^"]+)"')
+
 def get_internet_time():
-    """Fetches the current time from the World Time API for PST."""
+    """Fetches the current time for PST, over NTP or else from the World Time API."""
+    dt_object = get_ntp_time()
+    if dt_object is not None:
+        return dt_object
     try:
         # Using a reliable public API to get the current time
         # This automatically handles DST for the specified timezone
-        url = "http://worldtimeapi.org/api/timezone/America/Los_Angeles"
-        response = requests.get(url, timeout=10)
+        url = "https://worldtimeapi.org/api/timezone/America/Los_Angeles"
+        response = _SESSION.get(url, timeout=(3, 7), # (connect, read)
+                                headers={'Accept': 'application/json'})
         response.raise_for_status() # Raises an error for bad responses (4xx or 5xx)
         
-        data = response.json()
+        # Pick out the datetime field instead of decoding the whole reply
+        match = _DATETIME_FIELD.search(response.text)
         # The datetime is in ISO 8601 format, e.g., '2025-09-23T10:51:00.123456-07:00'
         # We parse it, ignoring the timezone info at the end as we just want wall-clock time
-        iso_datetime = data['datetime']
+        iso_datetime = match.group(1) if match else response.json()['datetime']
         dt_object = datetime.datetime.fromisoformat(iso_datetime.split('.')[0])
         
         print(f"Successfully fetched internet time: {dt_object}")
@@ -42,44 +91,75 @@ def get_internet_time():
         return None
 
 # --- RTC Communication ---
-def dec_to_bcd(dec):
-    """Convert a decimal number to Binary Coded Decimal."""
-    return (dec // 10 * 16) + (dec % 10)
+# BCD encoding of 0-99, so each conversion is a list index
+_BCD = [((i // 10) << 4) | (i % 10) for i in range(100)]
 
 def set_rtc_time(dt):
     """Sets the DS3231 RTC to the specified datetime object."""
     try:
-        bus = smbus2.SMBus(I2C_BUS)
+        bus = _get_bus()
+        
+        # Leave the clock alone if it already agrees, so re-runs don't restart its seconds.
+        # The RTC holds naive wall-clock time; any other dt is just written.
+        if dt.tzinfo is None:
+            current = read_rtc_time()
+            if current is not None and abs((dt - current).total_seconds()) < 1:
+                print(f"RTC already correct: {current.strftime('%Y-%m-%d %H:%M:%S')}")
+                return
         
         time_data = [
-            dec_to_bcd(dt.second),
-            dec_to_bcd(dt.minute),
-            dec_to_bcd(dt.hour),
-            dec_to_bcd(dt.isoweekday()), # Monday=1, Sunday=7
-            dec_to_bcd(dt.day),
-            dec_to_bcd(dt.month),
-            dec_to_bcd(dt.year - 2000)
+            _BCD[dt.second],
+            _BCD[dt.minute],
+            _BCD[dt.hour],
+            _BCD[dt.isoweekday()], # Monday=1, Sunday=7
+            _BCD[dt.day],
+            _BCD[dt.month],
+            _BCD[dt.year - 2000]
         ]
         
-        bus.write_i2c_block_data(DS3231_ADDRESS, 0x00, time_data)
-        bus.close()
-        print(f"Successfully set RTC time to: {dt.strftime('%Y-%m-%d %H:M:%S')}")
+        # Register pointer and all 7 time bytes in one write message
+        bus.i2c_rdwr(smbus2.i2c_msg.write(DS3231_ADDRESS, [0x00] + time_data))
+        print(f"Successfully set RTC time to: {dt.strftime('%Y-%m-%d %H:%M:%S')}")
 
     except FileNotFoundError:
         print(f"Error: I2C bus {I2C_BUS} not found. Ensure I2C is enabled on the Pi.")
     except Exception as e:
         print(f"An error occurred while setting the RTC time: {e}")
 
+def bcd_to_dec(bcd):
+    """Convert a Binary Coded Decimal number to decimal."""
+    return ((bcd >> 4) * 10) + (bcd & 0x0F)
+
+def _read_rtc_registers(count):
+    """Reads the first count time registers of the RTC."""
+    bus = _get_bus()
+    # Register pointer write and the read joined by a repeated start
+    write = smbus2.i2c_msg.write(DS3231_ADDRESS, [0x00])
+    read = smbus2.i2c_msg.read(DS3231_ADDRESS, count)
+    bus.i2c_rdwr(write, read)
+    return list(read)
+
+def read_rtc_time():
+    """Returns the RTC's current time as a datetime, or None if it can't be read."""
+    try:
+        time_data = _read_rtc_registers(7)
+        return datetime.datetime(
+            bcd_to_dec(time_data[6]) + 2000,
+            bcd_to_dec(time_data[5] & 0x1F),
+            bcd_to_dec(time_data[4]),
+            bcd_to_dec(time_data[2] & 0x3F),
+            bcd_to_dec(time_data[1]),
+            bcd_to_dec(time_data[0] & 0x7F),
+        )
+    except Exception:
+        # An unset RTC can hold an invalid date; just write over it
+        return None
+
 # --- MODIFIED: Renamed function to be more general ---
 def get_and_print_rtc_time():
     """Reads the time from the RTC and prints it."""
-    def bcd_to_dec(bcd):
-        return (bcd // 16 * 10) + (bcd % 16)
-        
     try:
-        bus = smbus2.SMBus(I2C_BUS)
-        time_data = bus.read_i2c_block_data(DS3231_ADDRESS, 0, 7)
-        bus.close()
+        time_data = _read_rtc_registers(7)
 
         sec = bcd_to_dec(time_data[0] & 0x7F)
         minute = bcd_to_dec(time_data[1])
@@ -90,7 +170,7 @@ def get_and_print_rtc_time():
         
         read_back_time = datetime.datetime(year, month, date, hour, minute, sec)
         # --- MODIFIED: Changed print message ---
-        print(f"Current RTC time is: {read_back_time.strftime('%Y-%m-%d %H:M:%S')}")
+        print(f"Current RTC time is: {read_back_time.strftime('%Y-%m-%d %H:%M:%S')}")
     except Exception as e:
         # --- MODIFIED: Changed print message ---
         print(f"Could not read time from RTC. Error: {e}")
@@ -109,7 +189,11 @@ if __name__ == "__main__":
     if args.manual:
         print("Manual mode selected.")
         try:
-            correct_time = datetime.datetime.strptime(args.manual, '%Y-%m-%d %H:M:%S')
+            # fromisoformat parses "YYYY-MM-DD HH:MM:SS" in C, unlike strptime,
+            # but it also takes bare dates, fractions and UTC offsets
+            correct_time = datetime.datetime.fromisoformat(args.manual)
+            if len(args.manual) != 19 or correct_time.tzinfo is not None:
+                raise ValueError(args.manual)
         except ValueError:
             print('Error: Manual time format is incorrect. Please use "YYYY-MM-DD HH:MM:SS".')
             exit(1)
@@ -120,7 +204,7 @@ if __name__ == "__main__":
     # --- MODIFIED: This logic is now changed ---
     if correct_time:
         set_rtc_time(correct_time)
-        time.sleep(1) # Pause before verifying
+        # The DS3231 takes the new time on the write's STOP, so read it straight back
         print("Verifying time after set...")
         get_and_print_rtc_time()
     else:
@@ -6,20 +6,17 @@ import sys
 # These pins should match your main.py and hardware wiring.
 RELAY_PIN = 5
 BOOST_PIN = 13
+SPARK_ON_US = 4_000_000  # spark length in microseconds
 
 def setup_gpio():
     """Initializes the GPIO chip and claims the necessary pins for output."""
     try:
         print("Attempting to open GPIO chip...")
         h = lgpio.gpiochip_open(0)
-        print(f"Claiming GPIO {BOOST_PIN} (Boost) as output.")
-        lgpio.gpio_claim_output(h, BOOST_PIN)
-        print(f"Claiming GPIO {RELAY_PIN} (Relay) as output.")
-        lgpio.gpio_claim_output(h, RELAY_PIN)
-        
-        # Set initial state to OFF
-        lgpio.gpio_write(h, BOOST_PIN, 0)
-        lgpio.gpio_write(h, RELAY_PIN, 0)
+        # One group, led by BOOST_PIN, so both pins switch in a single write
+        print(f"Claiming GPIO {BOOST_PIN} (Boost) and {RELAY_PIN} (Relay) as outputs.")
+        # Both pins start OFF as part of the claim itself
+        lgpio.group_claim_output(h, [BOOST_PIN, RELAY_PIN], [0, 0])
         
         print("SUCCESS: GPIO pins initialized and set to OFF.")
         return h
@@ -41,20 +38,20 @@ def execute_spark_sequence(h):
         
     print("\n--- STARTING SPARK SEQUENCE ---")
     try:
-        print(f"Step 1: Turning ON Boost Pin ({BOOST_PIN})...")
-        lgpio.gpio_write(h, BOOST_PIN, 1)
-        
-        print(f"Step 2: Turning ON Relay Pin ({RELAY_PIN})... (You should hear a click)")
-        lgpio.gpio_write(h, RELAY_PIN, 1)
-        
-        print("Step 3: Waiting for 4 seconds...")
-        time.sleep(4)
+        print(f"Step 1: Turning ON Boost ({BOOST_PIN}) and Relay ({RELAY_PIN}) Pins... (You should hear a click)")
+        # lgpio's timing thread, not Python, switches both pins back off,
+        # so the ON time doesn't depend on when this process gets scheduled
+        lgpio.tx_wave(h, BOOST_PIN, [
+            lgpio.pulse(0b11, 0b11, SPARK_ON_US),
+            lgpio.pulse(0b00, 0b11, 0),
+        ])
         
-        print(f"Step 4: Turning OFF Relay Pin ({RELAY_PIN})... (You should hear another click)")
-        lgpio.gpio_write(h, RELAY_PIN, 0)
+        print("Step 2: Waiting for 4 seconds...")
+        time.sleep(SPARK_ON_US / 1_000_000)
+        while lgpio.tx_busy(h, BOOST_PIN, lgpio.TX_WAVE):
+            time.sleep(0.01)
         
-        print(f"Step 5: Turning OFF Boost Pin ({BOOST_PIN})...")
-        lgpio.gpio_write(h, BOOST_PIN, 0)
+        print(f"Step 3: Relay ({RELAY_PIN}) and Boost ({BOOST_PIN}) Pins are OFF. (You should have heard another click)")
         print("--- SPARK SEQUENCE COMPLETE ---\n")
         
     except Exception as e:
@@ -72,6 +69,28 @@ def cleanup_gpio(h):
         except Exception as e:
             print(f"An error occurred during cleanup: {e}")
 
+def prompt_commands(prompt):
+    """
+    Yields lines typed at the terminal until EOF. input() blocks until a line
+    arrives, so waiting for the user costs no CPU.
+    """
+    while True:
+        try:
+            yield input(prompt)
+        except EOFError:
+            return
+
+def run_commands(h, commands):
+    """
+    Runs a spark sequence for each command until 'quit'. commands can be any
+    blocking iterable of lines, e.g. iter(sys.stdin.readline, '') for a pipe;
+    never a loop polling a non-blocking source.
+    """
+    for command in commands:
+        if command.strip().lower() == "quit":
+            break
+        execute_spark_sequence(h)
+
 def main():
     """Main function to run the interactive test."""
     gpio_handle = setup_gpio()
@@ -81,11 +100,7 @@ def main():
 
     try:
         print("\n--- Spark Hardware Test Utility ---")
-        while True:
-            command = input("Press ENTER to run a spark sequence, or type 'quit' to exit: ").lower()
-            if command == "quit":
-                break
-            execute_spark_sequence(gpio_handle)
+        run_commands(gpio_handle, prompt_commands("Press ENTER to run a spark sequence, or type 'quit' to exit: "))
             
     except KeyboardInterrupt:
         print("\nCtrl+C detected. Exiting.")
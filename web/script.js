@@ -6,6 +6,7 @@ let pmTimerInterval, pmTimeSinceSpark;
 let detectedUsbPath = null;
 let lastScreenId = 'welcome-screen';
 let hourlyCountdownInterval = null; // CHANGED: Added variable for the countdown timer
+let scanCountdownInterval = null; // Local pump countdown between TIME_LEFT updates
 
 const screenTitles = {
   'welcome-screen': 'Welcome',
@@ -100,6 +101,7 @@ function update_ui(msg) {
     document.getElementById('clean-progress').style.display = 'none';
     clearInterval(pmTimerInterval);
     clearInterval(hourlyCountdownInterval); // CHANGED: Stop countdown on abort/finish
+    clearInterval(scanCountdownInterval);
     id('hourly-monitor-next-event').textContent = '-'; // CHANGED: Reset countdown text
 
     const statusText = msg.includes('STOP') ? 'Operation stopped.' : 'Operation finished.';
@@ -117,9 +119,7 @@ function update_ui(msg) {
     id('scan-spark').textContent = `Spark: ${val}/${scanTotals.sparks}`;
     id('clean-spark').textContent = `Spark: ${val}/${cleanTotals.sparks}`;
   } else if (type === 'TIME_LEFT') {
-    let m = Math.floor((+val)/60000);
-    let s = Math.floor(((+val)%60000)/1000);
-    id('scan-time').textContent = `Time left: ${String(m).padStart(2,'0')}:${String(s).padStart(2,'0')}`;
+    startScanCountdown(+val);
   } else if (type === 'HOURLY_MONITOR_STATUS') {
     const [status, nextEvent] = val.split(',');
     setStatus('hourly-monitor-status', status);
@@ -127,6 +127,8 @@ function update_ui(msg) {
   } else if (type === 'HOURLY_NEXT_EVENT') {
     // CHANGED: New logic to handle countdown timer updates
     startHourlyCountdown(val);
+  } else if (type === 'RTC_SYNC') {
+    // Background RTC sync finished; the message is only logged above
   } else {
     // This block handles PM monitoring
     const activeScreen = document.querySelector('.screen.active').id;
@@ -149,6 +151,22 @@ function update_ui(msg) {
   }
 }
 
+// Python only sends TIME_LEFT every 10 seconds; tick the display locally in between
+function startScanCountdown(timeLeftMs) {
+  clearInterval(scanCountdownInterval);
+  const deadline = Date.now() + timeLeftMs;
+
+  const render = () => {
+    const left = Math.max(0, deadline - Date.now());
+    let m = Math.floor(left/60000);
+    let s = Math.floor((left%60000)/1000);
+    id('scan-time').textContent = `Time left: ${String(m).padStart(2,'0')}:${String(s).padStart(2,'0')}`;
+    if (left === 0) clearInterval(scanCountdownInterval);
+  };
+  render();
+  scanCountdownInterval = setInterval(render, 1000);
+}
+
 // CHANGED: New function to manage the countdown timer
 function startHourlyCountdown(isoString) {
   clearInterval(hourlyCountdownInterval); // Clear any old timer
@@ -321,8 +339,17 @@ function populateFileList() {
   });
 }
 
+// Views a base64 little-endian array from get_scan_data as a typed array
+function decodeArray(b64, ArrayType) {
+  const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+  return new ArrayType(bytes.buffer);
+}
+
 function loadScan(path) {
-  eel.get_scan_data(path)((data) => {
+  eel.get_scan_data(path)((reply) => {
+    const data = JSON.parse(reply); // sent pre-serialized from Python
+    if (data && data.x_b64 !== undefined) data.x = decodeArray(data.x_b64, Float32Array);
+    if (data && data.y_b64 !== undefined) data.y = decodeArray(data.y_b64, Uint16Array);
     if (!data || !data.x || !data.y || data.x.length === 0) {
       console.error("Invalid or empty data:", data);
       // Update plot with an error message